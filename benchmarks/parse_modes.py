@@ -0,0 +1,46 @@
+"""
+Compare the tree-sitter parse paths of AbstractSyntaxTree on a target directory.
+
+Usage:
+    python benchmarks/parse_modes.py <TARGET_DIR> [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pyclue"))
+
+from abstract_syntax_tree import AbstractSyntaxTree
+from constants import AppConfig, ParseMode
+import utils
+
+def time_parse_mode(target_dir, file_paths, parse_mode: ParseMode):
+    start = time.perf_counter()
+    for file_path in file_paths:
+        with AbstractSyntaxTree(repo_path=target_dir, file_path=file_path, parse_mode=parse_mode):
+            pass
+    return time.perf_counter() - start
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("target_dir")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    file_paths = list(utils.traverse_directory(args.target_dir,
+                                               restrict_extensions=AppConfig.SUPPORTED_FILE_EXTENSIONS,
+                                               ignore_dirs=AppConfig.IGNORE_DIRECTORIES))
+    total_bytes = sum(os.path.getsize(file_path) for file_path in file_paths)
+    print(f"{len(file_paths)} files, {total_bytes / 1e6:.2f} MB\n")
+
+    print(f"{'Parse mode':<12} {'Best (s)':<10} {'MB/s':<10} {'Speedup':<10}")
+    print(f"{'-'*42}")
+    baseline = None
+    for parse_mode in ParseMode:
+        best = min(time_parse_mode(args.target_dir, file_paths, parse_mode) for _ in range(args.repeat))
+        baseline = baseline or best
+        print(f"{parse_mode.value:<12} {round(best, 5):<10} {round(total_bytes / 1e6 / best, 2):<10} {round(baseline / best, 1):<10}")
+
+if __name__ == "__main__":
+    main()
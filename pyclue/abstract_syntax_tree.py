@@ -1,84 +1,155 @@
+from array import array
+from itertools import repeat
 from tree_sitter import Parser, Tree, Node
 
-from constants import TSLanguage, TSNodeGroup, DummyNode, EdgeType, TypePairs
+from constants import TSLanguage, TSNodeGroup, DummyNode, EdgeType, TypePairs, ParseMode
+from source_store import SourceStore
 import utils
 
+_FIELD_NAME_UNSET = object()
+
 class AbstractSyntaxTree:
-    def __init__(self, repo_path, file_path):
+    def __init__(self, repo_path, file_path, parse_mode: ParseMode=ParseMode.BUFFER, file_id: int=None):
         self.repo_path = repo_path
         self.path = file_path
+        self.rel_path = utils.get_relative_path(self.path, self.repo_path)
+        # The path derived ID unless the caller resolved a collision with another file
+        self.file_id = file_id if file_id is not None else utils.generate_file_id(self.rel_path)
+        self.parse_mode = ParseMode(parse_mode)
         self.parser = Parser(TSLanguage.PY_LANGUAGE)
-        self.src_bytes = utils.get_file_bytes(".py", self.path)
+        self.src_bytes = self.load_source()
         self.tree: Tree = self.parse()
         
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
+    def load_source(self):
+        """
+        Load the source of the file according to the parse mode. Every mode validates UTF-8 once.
+        """
+        if self.parse_mode == ParseMode.MMAP:
+            return utils.get_file_mmap(self.path)
+        return utils.get_file_bytes(".py", self.path)
+    
+    def close(self):
+        """
+        Release the memory-mapped source, if any. Node text can not be read after closing.
+        """
+        if hasattr(self.src_bytes, "close"):
+            self.src_bytes.close()
+        
     def _read_callable_byte_offset(self, byte_offset, point):
         return self.src_bytes[byte_offset : byte_offset + 1]
 
     def parse(self):
-        return self.parser.parse(self._read_callable_byte_offset, encoding="utf8")
+        if self.parse_mode == ParseMode.CALLBACK:
+            return self.parser.parse(self._read_callable_byte_offset, encoding="utf8")
+        # bytes and mmap both expose the buffer protocol, so the parser reads them in place
+        return self.parser.parse(self.src_bytes, encoding="utf8")
+        
+    def reparse(self, src_bytes: bytes):
+        """
+        Re-parses new source for the same file, letting tree-sitter reuse the unchanged parts of the previous tree.
+        Returns the ranges whose syntactic structure changed.
+        """
+        old_src = self.src_bytes
+        start_byte = utils.common_prefix_length(old_src, src_bytes)
+        suffix = utils.common_suffix_length(old_src, src_bytes, limit=min(len(old_src), len(src_bytes)) - start_byte)
+        old_end_byte = len(old_src) - suffix
+        new_end_byte = len(src_bytes) - suffix
+        
+        self.tree.edit(
+            start_byte=start_byte,
+            old_end_byte=old_end_byte,
+            new_end_byte=new_end_byte,
+            start_point=utils.byte_offset_to_point(old_src, start_byte),
+            old_end_point=utils.byte_offset_to_point(old_src, old_end_byte),
+            new_end_point=utils.byte_offset_to_point(src_bytes, new_end_byte),
+        )
+        new_tree = self.parser.parse(src_bytes, self.tree, encoding="utf8")
+        changed_ranges = self.tree.changed_ranges(new_tree)
         
+        self.close()
+        self.src_bytes = src_bytes
+        self.tree = new_tree
+        return changed_ranges
+    
     def generate_nodes_and_edges(self, node: Node, parent=None):
         """
-        Recursively traverses Tree-sitter syntax tree and adds to NetworkX graph.
-        Uses the node's start_byte as the unique identifier.
+        Traverses Tree-sitter syntax tree with a single TreeCursor and collects nodes and edges for NetworkX graph.
+        Nodes are emitted in pre-order, and skipped nodes are not descended into.
+        Node IDs pack the file ID with the node's pre-order ordinal (starting at 1, so no ID is 0),
+        which keeps them stable for the same file content when walking from the root node.
         """
         nodes = []
         edges = []
+        ordinal = 0
         
-        current_node_id = self.generate_node_unique_id(node)
-        
-        # Add the current node with its type as an attribute
-        node_props = self.get_node_properties(node)
-        if node_props is None:
-            return [], []
-        else:
-            nodes.append((current_node_id, node_props))
-        
-        # Add a dummy node for required node types
-        if node.type in TSNodeGroup.NODES_WITH_DUMMY_NODE:
-            if node.type in [TSNodeGroup.MODULE, TSNodeGroup.CLS_NODE]:
-                dummy_A = self.generate_node_unique_id(node, DummyNode.START)
-                nodes.append((dummy_A, self.generate_dummy_node(node, DummyNode.START)))
-                edges.append((current_node_id, dummy_A, EdgeType.AST))
-                dummy_B = self.generate_node_unique_id(node, DummyNode.EXIT)
-                nodes.append((dummy_B, self.generate_dummy_node(node, DummyNode.EXIT)))
-                edges.append((current_node_id, dummy_B, EdgeType.AST))
-            elif node.type == TSNodeGroup.FN_NODE:
-                dummy_A = self.generate_node_unique_id(node, DummyNode.ENTRY)
-                nodes.append((dummy_A, self.generate_dummy_node(node, DummyNode.ENTRY)))
-                edges.append((current_node_id, dummy_A, EdgeType.AST))
-                dummy_B = self.generate_node_unique_id(node, DummyNode.RETURN)
-                nodes.append((dummy_B, self.generate_dummy_node(node, DummyNode.RETURN)))
-                edges.append((current_node_id, dummy_B, EdgeType.AST))
+        cursor = node.walk()
+        parent_ids = [parent]
+        field_name = self.get_field_name(node)
         
-        if parent is not None:
-            # Add an edge from the parent node to the current node
-            edges.append((parent, current_node_id, EdgeType.AST))
-        
-        # Traverse child nodes recursively
-        for child in node.children:
-            child_nodes, child_edges = self.generate_nodes_and_edges(child, current_node_id)
+        while True:
+            current_node = cursor.node
+            node_props = self.get_node_properties(current_node, field_name)
             
-            # Accumulate nodes and edges from the child
-            nodes.extend(child_nodes)
-            edges.extend(child_edges)
+            if node_props is not None:
+                ordinal += 1
+                current_node_id = utils.pack_node_id(self.file_id, ordinal)
+                nodes.append((current_node_id, node_props))
+                
+                # Add a dummy node for required node types
+                if current_node.type in TSNodeGroup.NODES_WITH_DUMMY_NODE:
+                    if current_node.type in [TSNodeGroup.MODULE, TSNodeGroup.CLS_NODE]:
+                        dummy_fields = (DummyNode.START, DummyNode.EXIT)
+                    else:
+                        dummy_fields = (DummyNode.ENTRY, DummyNode.RETURN)
+                    
+                    for dummy_field in dummy_fields:
+                        ordinal += 1
+                        dummy_id = utils.pack_node_id(self.file_id, ordinal)
+                        nodes.append((dummy_id, self.generate_dummy_node(node_props, dummy_field)))
+                        edges.append((current_node_id, dummy_id, EdgeType.AST))
+                
+                if parent_ids[-1] is not None:
+                    # Add an edge from the parent node to the current node
+                    edges.append((parent_ids[-1], current_node_id, EdgeType.AST))
+                
+                if cursor.goto_first_child():
+                    parent_ids.append(current_node_id)
+                    field_name = cursor.field_name
+                    continue
             
-        return nodes, edges
+            # Move to the next sibling, climbing up until one exists or the walk is back at the start node
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return nodes, edges
+                parent_ids.pop()
+            field_name = cursor.field_name
     
-    def generate_node_unique_id(self, node: Node, dummy_str=None):
+    def generate_legacy_node_id(self, node: Node, dummy_str=None):
         """
-        Generates a unique identifier for a node based on its file relative path, type, start_byte, and end_byte.
+        Generates the legacy string identifier for a node based on its file relative path, type, start_byte, and end_byte.
         """
-        rel_path = utils.get_relative_path(self.path, self.repo_path)
-        string_to_hash = f"{rel_path}.{node.type}.{node.start_byte}.{node.end_byte}"
-        if dummy_str:
-            string_to_hash += f".{dummy_str}"
-        
-        return utils.generate_uuid(string_to_hash)
+        return utils.generate_legacy_node_id(self.rel_path, node.type, node.start_byte, node.end_byte, dummy_str)
+    
+    def get_field_name(self, node: Node):
+        """
+        Looks up the field name of a node in its parent. Prefer TreeCursor.field_name while walking.
+        """
+        if node.parent:
+            for i in range(node.parent.child_count):
+                if node.parent.child(i) == node:
+                    return node.parent.field_name_for_child(i)
+        return None
     
-    def get_node_properties(self, node: Node):
+    def get_node_properties(self, node: Node, field_name=_FIELD_NAME_UNSET):
         """
         Extracts the properties of a tree-sitter node for the graph.
+        The field name is looked up from the parent when it is not passed in.
         """
         node_type = node.type
         
@@ -86,39 +157,150 @@ class AbstractSyntaxTree:
         if node_type in TSNodeGroup.SKIP_NODES_BY_TYPE:
             return None
         
+        if field_name is _FIELD_NAME_UNSET:
+            field_name = self.get_field_name(node)
+        
         props = {
             "type": node_type,
-            "field_name": None,
+            "field_name": field_name,
             "text": None,
             "src_bytes_range": (node.start_byte, node.end_byte),
             "start_point": (node.start_point.row, node.start_point.column),
             "end_point": (node.end_point.row, node.end_point.column),
-            "module": utils.get_relative_path(self.path, self.repo_path)
+            "module": self.rel_path
         }
         
-         # If the node has a parent, retrieve its field name (if any)
-        if node.parent:
-            for i in range(node.parent.child_count):
-                if node.parent.child(i) == node:
-                    props["field_name"] = node.parent.field_name_for_child(i)
-                    break
-        
         if node_type in TSNodeGroup.NODES_WITH_TEXT:
             props["text"] = self.src_bytes[node.start_byte : node.end_byte].decode("utf8")
         elif node_type in TSNodeGroup.NODES_WITH_TEXT_MASKED:
             props["text"] = f"{{{node_type}}}"
             
         elif node_type == TSNodeGroup.MODULE:
-            props["path"] = utils.get_relative_path(self.path, self.repo_path)
+            props["path"] = self.rel_path
             
         if node_type in TSNodeGroup.ELEMENTARY_TYPES:
             props["inferred_type"] = TypePairs.covert_ts_to_py_type(node_type)
             
         return props
     
-    def generate_dummy_node(self, node: Node, dummy_field_name: str):
-        props = self.get_node_properties(node)
+    def generate_dummy_node(self, node_props: dict, dummy_field_name: str):
+        props = dict(node_props)
         props["type"] = "dummy"
         props["field_name"] = dummy_field_name
         props["text"] = None
-        return props
\ No newline at end of file
+        return props
+    
+class ASTColumns:
+    """
+    Columnar form of the nodes and edges generated for one file: integer arrays plus an interned string table.
+    It pickles far smaller and faster than a list of node dicts, so it is what AST workers send back to the parent.
+    """
+    NONE = -1
+    
+    def __init__(self):
+        self.strings = []
+        self._string_codes = {}
+        self.ids = array("Q")
+        self.types = array("i")
+        self.field_names = array("i")
+        self.texts = array("i")
+        self.modules = array("i")
+        self.paths = array("i")
+        self.inferred_types = array("i")
+        self.spans = array("I")  # start_byte, end_byte, start_row, start_column, end_row, end_column per node
+        self.parents = array("i")  # position of the AST parent of each node, the syntax tree gives each node one parent
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def __getstate__(self):
+        # The string table is enough to rebuild codes, there is no need to ship the lookup dict
+        state = dict(self.__dict__)
+        del state["_string_codes"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._string_codes = {string: code for code, string in enumerate(self.strings)}
+    
+    def intern(self, string):
+        if string is None:
+            return self.NONE
+        code = self._string_codes.get(string)
+        if code is None:
+            code = self._string_codes[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+    
+    @staticmethod
+    def from_nodes_and_edges(nodes: list, edges: list):
+        columns = ASTColumns()
+        for node_id, props in nodes:
+            columns.ids.append(node_id)
+            columns.types.append(columns.intern(props["type"]))
+            columns.field_names.append(columns.intern(props["field_name"]))
+            columns.texts.append(columns.intern(props["text"]))
+            columns.modules.append(columns.intern(props["module"]))
+            columns.paths.append(columns.intern(props.get("path")))
+            columns.inferred_types.append(columns.intern(props.get("inferred_type")))
+            columns.spans.extend(props["src_bytes_range"])
+            columns.spans.extend(props["start_point"])
+            columns.spans.extend(props["end_point"])
+        
+        # Every edge generated from a syntax tree is an AST edge to a node's only parent
+        positions = {node_id: i for i, node_id in enumerate(columns.ids)}
+        columns.parents.extend(repeat(ASTColumns.NONE, len(columns.ids)))
+        for source, target, _ in edges:
+            columns.parents[positions[target]] = positions[source]
+        
+        return columns
+    
+    def set_file_id(self, file_id: int):
+        """
+        Move the nodes to another file ID, keeping their ordinals. Edges follow, they are stored as node positions.
+        """
+        self.ids = array("Q", (utils.pack_node_id(file_id, utils.unpack_node_id(node_id)[1]) for node_id in self.ids))
+    
+    def iter_nodes(self, file_index: int=None):
+        """
+        Yields (node ID, properties) pairs in the same shape as AbstractSyntaxTree.generate_nodes_and_edges.
+        When a SourceStore file index is given, lazy records are yielded instead, holding the span and the file index
+        in place of text, points and module.
+        """
+        strings = self.strings + [None]  # code -1 (NONE) resolves to None
+        spans = self.spans
+        for i, node_id in enumerate(self.ids):
+            if file_index is not None:
+                props = {
+                    "type": strings[self.types[i]],
+                    "field_name": strings[self.field_names[i]],
+                    "src_bytes_range": (spans[6 * i], spans[6 * i + 1]),
+                    SourceStore.FILE_INDEX: file_index,
+                }
+            else:
+                props = {
+                    "type": strings[self.types[i]],
+                    "field_name": strings[self.field_names[i]],
+                    "text": strings[self.texts[i]],
+                    "src_bytes_range": (spans[6 * i], spans[6 * i + 1]),
+                    "start_point": (spans[6 * i + 2], spans[6 * i + 3]),
+                    "end_point": (spans[6 * i + 4], spans[6 * i + 5]),
+                    "module": strings[self.modules[i]],
+                }
+            if self.paths[i] != self.NONE:
+                props["path"] = strings[self.paths[i]]
+            if self.inferred_types[i] != self.NONE:
+                props["inferred_type"] = strings[self.inferred_types[i]]
+            yield node_id, props
+    
+    def iter_edges(self):
+        """
+        Yields AST edges ordered by their target node, which keeps each node's successors in source order.
+        """
+        ids = self.ids
+        for i, parent in enumerate(self.parents):
+            if parent != self.NONE:
+                yield ids[parent], ids[i], EdgeType.AST
+    
+    def to_nodes_and_edges(self):
+        return list(self.iter_nodes()), list(self.iter_edges())
@@ -0,0 +1,74 @@
+import numpy as np
+
+class AdjacencyBundle:
+    """
+    The CPG as arrays for batch analytics, stored as an uncompressed .npz file.
+
+    Nodes are numbered 0..N-1 in graph order. For every node the bundle holds its packed node ID, optionally its
+    legacy string ID, and one int32 code per feature column indexing that column's vocabulary (-1 for None).
+    For every edge type it holds CSR arrays over node numbers: the successors of node i are
+    targets[offsets[i]:offsets[i + 1]], in edge insertion order.
+    Loading needs only NumPy.
+    """
+    FEATURE_COLUMNS = ["type", "field_name", "module", "inferred_type"]
+    NONE_CODE = -1
+
+    def __init__(self, node_ids: np.ndarray, columns: dict, vocabularies: dict, edges: dict, legacy_ids: np.ndarray=None):
+        self.node_ids = node_ids  # uint64
+        self.columns = columns  # column name -> int32 codes
+        self.vocabularies = vocabularies  # column name -> str array
+        self.edges = edges  # edge type -> (int64 offsets, uint32 targets)
+        self.legacy_ids = legacy_ids
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    @staticmethod
+    def encode_column(values: list) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Codes and vocabulary of a column of strings or None, the vocabulary in order of first appearance.
+        """
+        vocabulary = {}
+        codes = np.fromiter((AdjacencyBundle.NONE_CODE if value is None else vocabulary.setdefault(value, len(vocabulary))
+                             for value in values), dtype=np.int32, count=len(values))
+        return codes, np.array(list(vocabulary), dtype=str)
+
+    @staticmethod
+    def group_edges(sources: np.ndarray, targets: np.ndarray, node_count: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        CSR arrays of edges given as source and target node numbers in insertion order.
+        """
+        order = np.argsort(sources, kind="stable")
+        offsets = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=node_count), out=offsets[1:])
+        return offsets, targets[order].astype(np.uint32)
+
+    def get_successors(self, index: int, edge_type: str) -> np.ndarray:
+        offsets, targets = self.edges[edge_type]
+        return targets[offsets[index]:offsets[index + 1]]
+
+    def get_feature(self, column: str, index: int):
+        code = self.columns[column][index]
+        return None if code == self.NONE_CODE else str(self.vocabularies[column][code])
+
+    def save(self, path):
+        arrays = {"node_ids": self.node_ids, "edge_types": np.array(list(self.edges), dtype=str)}
+        if self.legacy_ids is not None:
+            arrays["legacy_ids"] = self.legacy_ids
+        for column, codes in self.columns.items():
+            arrays[f"column_{column}"] = codes
+            arrays[f"vocabulary_{column}"] = self.vocabularies[column]
+        for i, (offsets, targets) in enumerate(self.edges.values()):
+            arrays[f"offsets_{i}"] = offsets
+            arrays[f"targets_{i}"] = targets
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @staticmethod
+    def load(path) -> "AdjacencyBundle":
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name[len("column_"):]: data[name] for name in data.files if name.startswith("column_")}
+            vocabularies = {column: data[f"vocabulary_{column}"] for column in columns}
+            edges = {str(edge_type): (data[f"offsets_{i}"], data[f"targets_{i}"]) for i, edge_type in enumerate(data["edge_types"])}
+            legacy_ids = data["legacy_ids"] if "legacy_ids" in data.files else None
+            return AdjacencyBundle(data["node_ids"], columns, vocabularies, edges, legacy_ids)
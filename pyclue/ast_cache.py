@@ -0,0 +1,158 @@
+import os
+import pickle
+import hashlib
+import logging
+import functools
+import importlib.metadata
+
+from constants import AppConfig, TSLanguage
+
+class ASTCache:
+    """
+    Persistent cache of per-file AST columns, keyed by file content.
+    Entries are evicted least recently used first once the cache grows past its size cap.
+    """
+    NAME = "AST cache"
+    ENTRY_EXTENSION = ".ast.pkl"
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache_dir, max_size_mb: int=AppConfig.AST_CACHE_MAX_SIZE_MB):
+        self.cache_dir = str(cache_dir)
+        self.max_size = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def source_version() -> str:
+        """
+        Hash of the sources of all pyclue modules, so that entries made by other code are not reused even when
+        the version number was not bumped.
+        """
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        sha256 = hashlib.sha256()
+        for file_name in sorted(os.listdir(package_dir)):
+            if file_name.endswith(".py"):
+                sha256.update(file_name.encode("utf-8"))
+                sha256.update(b"\0")
+                with open(os.path.join(package_dir, file_name), "rb") as f:
+                    sha256.update(f.read())
+                sha256.update(b"\0")
+        return sha256.hexdigest()
+
+    @staticmethod
+    def version_tag() -> str:
+        """
+        Everything besides file content that changes the generated AST: pyclue version and source, grammar versions.
+        """
+        try:
+            grammar_version = importlib.metadata.version("tree-sitter-python")
+        except importlib.metadata.PackageNotFoundError:
+            grammar_version = "unknown"
+        return (f"pyclue-{AppConfig.VERSION}.source-{ASTCache.source_version()}.format-{ASTCache.FORMAT_VERSION}"
+                f".tree-sitter-python-{grammar_version}.abi-{TSLanguage.PY_LANGUAGE.version}")
+
+    @staticmethod
+    def generate_key(rel_path: str, src_bytes: bytes) -> str:
+        """
+        Node IDs and module attributes embed the relative path, so it is part of the key along with the content.
+        """
+        sha256 = hashlib.sha256()
+        sha256.update(ASTCache.version_tag().encode("utf-8"))
+        sha256.update(b"\0")
+        sha256.update(rel_path.replace(os.sep, "/").encode("utf-8"))
+        sha256.update(b"\0")
+        sha256.update(src_bytes)
+        return sha256.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + self.ENTRY_EXTENSION)
+
+    def get(self, key: str):
+        """
+        Load the cached entry (ASTColumns for the AST cache) for a key, or None on a miss.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "rb") as f:
+                columns = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable {self.NAME} entry {entry_path}: {e}")
+            self._remove(entry_path)
+            return None
+
+        # Touch the entry so that eviction is least recently used first
+        os.utime(entry_path)
+        return columns
+
+    def put(self, key: str, columns):
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        # Write to a temporary file first so concurrent workers never read a partial entry
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(columns, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def entries(self):
+        """
+        Yields (path, size, mtime) of every cache entry.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                if file.endswith(self.ENTRY_EXTENSION):
+                    entry_path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(entry_path)
+                    except FileNotFoundError:
+                        continue
+                    yield entry_path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in its size cap.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total_size = sum(size for _, size, _ in entries)
+
+        evicted = 0
+        for entry_path, size, _ in entries:
+            if total_size <= self.max_size:
+                break
+            self._remove(entry_path)
+            total_size -= size
+            evicted += 1
+
+        if evicted:
+            self.logger.info(f"Evicted {evicted} {self.NAME} entries, cache size is now {total_size / (1024 * 1024):.1f} MB")
+
+    def clear(self):
+        for entry_path, _, _ in list(self.entries()):
+            self._remove(entry_path)
+        self.logger.info(f"{self.NAME} cleared: \033[94m{self.cache_dir}\033[0m")
+
+    def log_stats(self):
+        self.logger.info(f"{self.NAME} hits: {self.hits}, misses: {self.misses}, hit rate: {self.hit_rate():.1%}")
+
+    def _remove(self, entry_path: str):
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
@@ -1,11 +1,14 @@
 import os
-import time
 import typer
 from pathlib import Path
 
 from code_property_graph import CodePropertyGraph
+from ast_cache import ASTCache
+from definitions_cache import DefinitionsCache
 from infer import TypeInference
-from constants import AppLogger
+from incremental import IncrementalCodePropertyGraph
+from stats import StageStats
+from constants import AppLogger, AppConfig, ParseMode, GraphBackend, DataFlowEngine, ExportFormat, EdgeType
 import visualize
 
 app = typer.Typer(add_completion=False)
@@ -16,53 +19,121 @@ def run(
     output_dir: Path = typer.Argument(..., help="The directory where the output files will be saved."),
     infer_types: bool = typer.Option(True, help="Flag to enable or disable type inference."),
     export_graph: bool = typer.Option(True, help="Flag to enable or disable exporting the CPG."),
+    export_format: ExportFormat = typer.Option(ExportFormat.JSON, help="File format of the exported CPG. npz writes per edge type CSR arrays and coded node features."),
     visualize_graph: bool = typer.Option(False, help="Flag to enable or disable visualization of the CPG."),
-    save_log: bool = typer.Option(False, help="Flag to enable or disable saving logs to a file.")
+    save_log: bool = typer.Option(False, help="Flag to enable or disable saving logs to a file."),
+    parse_mode: ParseMode = typer.Option(ParseMode.BUFFER, help="How source files are handed to the parser."),
+    legacy_ids: bool = typer.Option(True, help="Flag to export legacy string node IDs instead of integer node IDs."),
+    cache_dir: Path = typer.Option(None, help="Directory of the persistent AST and module definitions caches. Caching is disabled when not set."),
+    clear_cache: bool = typer.Option(False, help="Flag to clear the AST and definitions caches before generating the CPG."),
+    cache_max_size: int = typer.Option(AppConfig.AST_CACHE_MAX_SIZE_MB, help="Size cap of each cache in MB, least recently used entries are evicted first."),
+    watch: bool = typer.Option(False, help="Flag to keep watching the target directory and incrementally update the CPG on changes."),
+    watch_interval: float = typer.Option(1.0, help="Seconds between polls for changed files in watch mode."),
+    workers: int = typer.Option(None, help="Number of worker processes for AST generation. Defaults to the CPU count."),
+    pipeline: bool = typer.Option(False, help="Flag to also generate CF and module-local DF edges in the worker processes."),
+    lazy_text: bool = typer.Option(False, help="Flag to keep only source spans on nodes and read their text from the files on demand."),
+    compact_nodes: bool = typer.Option(False, help="Flag to store node attributes in shared arrays instead of a dict per node."),
+    backend: GraphBackend = typer.Option(GraphBackend.NETWORKX, help="Graph implementation to build the CPG in. The CSR backend takes far less memory but does not support watch mode."),
+    df_engine: DataFlowEngine = typer.Option(DataFlowEngine.WALK, help="How DF edges are derived from control flow. reaching_definitions links every definition that reaches a use over some path, loops included."),
+    stats_json: Path = typer.Option(None, help="File to write the per stage time, graph size and memory report to as JSON."),
+    trace_memory: bool = typer.Option(False, help="Flag to add tracemalloc peaks of the main process and estimated graph bytes to the stage report. Slows the run down.")
 ):
-    stages = [{"start": time.time()}]
+    if watch and backend == GraphBackend.CSR:
+        raise typer.BadParameter("Watch mode updates the graph in place, which needs the networkx backend.", param_hint="--backend")
+    
+    stats = StageStats(trace_memory=trace_memory)
     
     repo_name = os.path.basename(os.path.normpath(target_dir))
     
     if save_log:
         AppLogger.add_file_handler(os.path.join(output_dir, f"{repo_name}.log"))
 
-    cpg = CodePropertyGraph(dir=target_dir)
+    ast_cache = None
+    definitions_cache = None
+    if cache_dir:
+        ast_cache = ASTCache(cache_dir, max_size_mb=cache_max_size)
+        definitions_cache = DefinitionsCache(cache_dir, max_size_mb=cache_max_size)
+        if clear_cache:
+            ast_cache.clear()
+            definitions_cache.clear()
+
+    cpg = CodePropertyGraph(dir=target_dir, parse_mode=parse_mode, ast_cache=ast_cache, workers=workers,
+                            pipeline=pipeline, lazy_text=lazy_text, compact_nodes=compact_nodes, backend=backend,
+                            df_engine=df_engine, definitions_cache=definitions_cache)
     cpg.generate_asts()
+    stats.record("ast_generation", cpg.graph)
     cpg.generate_cfgs()
+    stats.record("cfg_generation", cpg.graph)
     cpg.generate_dfgs()
-    stages.append({"cpg_generation": time.time()})
+    stats.record("dfg_generation", cpg.graph)
     
     if export_graph:
-        cpg.export(output_path=os.path.join(output_dir, f"{repo_name}.cpg.json"))
-        stages.append({"graph_export": time.time()})
+        cpg.export(output_path=os.path.join(output_dir, f"{repo_name}.cpg.{export_format.value}"), legacy_ids=legacy_ids)
+        stats.record("graph_export")
     
     if visualize_graph:
         visualize.render(cpg.graph, output_path=os.path.join(output_dir, f"{repo_name}.cpg.png"))
-        stages.append({"cpg_visualization": time.time()})
+        stats.record("cpg_visualization")
         
         
     if infer_types:
         inf = TypeInference(cpg)
         inf.infer_types()
-        stages.append({"type_inference": time.time()})
+        stats.record("type_inference", inf.cpg.graph)
         
         if export_graph:
-            inf.cpg.export(output_path=os.path.join(output_dir, f"{repo_name}_inferred.cpg.json"))
-            stages.append({"inferred_graph_export": time.time()})
+            inf.cpg.export(output_path=os.path.join(output_dir, f"{repo_name}_inferred.cpg.{export_format.value}"), legacy_ids=legacy_ids)
+            stats.record("inferred_graph_export")
             
         if visualize_graph:
             visualize.render(inf.cpg.graph, output_path=os.path.join(output_dir, f"{repo_name}_inferred.cpg.png"))
-            stages.append({"inferred_cpg_visualization": time.time()})
+            stats.record("inferred_cpg_visualization")
         
-    log_execution_times(stages)
+    log_execution_times(stats.stages)
+    if stats_json:
+        stats.write_json(stats_json)
+    stats.close()
+    
+    if ast_cache:
+        log_cache_stats(ast_cache)
+        log_cache_stats(definitions_cache)
+        
+    if watch:
+        watch_target(cpg, output_dir, repo_name, infer_types, export_graph, export_format, legacy_ids, watch_interval)
+
+def watch_target(cpg: CodePropertyGraph, output_dir, repo_name, infer_types, export_graph, export_format, legacy_ids, watch_interval):
+    incremental_cpg = IncrementalCodePropertyGraph(cpg, infer_types=infer_types)
+    file_name = f"{repo_name}_inferred.cpg.{export_format.value}" if infer_types else f"{repo_name}.cpg.{export_format.value}"
+    
+    def on_update(changed, deleted):
+        if export_graph:
+            cpg.export(output_path=os.path.join(output_dir, file_name), legacy_ids=legacy_ids)
+    
+    try:
+        incremental_cpg.watch(interval=watch_interval, on_update=on_update)
+    except KeyboardInterrupt:
+        pass
 
 def log_execution_times(stages: list):
-    print(f"\n{'Stage':<40} {'Time (s)':<10}")
+    def mb(size):
+        return f"{size / (1 << 20):.1f}" if size is not None else "-"
+    
+    print(f"\n{'Stage':<30} {'Time (s)':<10} {'Nodes':<10} {'Edges (AST/CF/DF)':<26} {'Peak RSS (MB)':<14} "
+          f"{'Workers RSS (MB)':<17} {'Main traced (MB)':<17} {'Graph (MB)':<10}")
+    print(f"{'-'*139}")
+    for stage in stages:
+        edges = stage.get("edges")
+        edge_counts = "/".join(str(edges.get(edge_type, 0)) for edge_type in [EdgeType.AST, EdgeType.CF, EdgeType.DF]) if edges is not None else "-"
+        print(f"{stage['stage']:<30} {round(stage['seconds'], 5):<10} {stage.get('nodes', '-'):<10} {edge_counts:<26} "
+              f"{mb(stage['peak_rss_bytes']):<14} {mb(stage['workers_peak_rss_bytes']):<17} "
+              f"{mb(stage.get('traced_peak_bytes')):<17} {mb(stage.get('graph_bytes')):<10}")
+
+def log_cache_stats(cache: ASTCache):
+    print(f"\n{cache.NAME[0].upper() + cache.NAME[1:]:<40} {'Count':<10}")
     print(f"{'-'*50}")
-    for i in range(1, len(stages)):
-        stage_name = list(stages[i].keys())[0]
-        time_taken = stages[i][stage_name] - stages[i-1][list(stages[i-1].keys())[0]]
-        print(f"{stage_name:<40} {round(time_taken, 5):<10}")
+    print(f"{'hits':<40} {cache.hits:<10}")
+    print(f"{'misses':<40} {cache.misses:<10}")
+    print(f"{'hit rate':<40} {f'{cache.hit_rate():.1%}':<10}")
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -1,78 +1,561 @@
 import networkx as nx
+import numpy as np
 import json
 import logging
 import os
+import time
+import heapq
+import itertools
 import concurrent.futures
+import multiprocessing
+from array import array
 
-from abstract_syntax_tree import AbstractSyntaxTree
+from abstract_syntax_tree import AbstractSyntaxTree, ASTColumns
+from ast_cache import ASTCache
+from definitions_cache import DefinitionsCache
+from source_store import SourceStore
+from node_records import CompactMultiDiGraph
+from indexed_graph import IndexedMultiDiGraph
+from csr_graph import CSRMultiDiGraph
+from adjacency_bundle import AdjacencyBundle
 from control_flow_graph import ControlFlowGraph
-from data_flow_graph import DataFlowGraph
-from visitor import GraphVisitor
-from constants import AppConfig
+from data_flow_graph import DataFlowGraph, Definitions
+from visitor import GraphVisitor, GraphTreeVisitor
+from constants import AppConfig, ParseMode, GraphBackend, DataFlowEngine, TSNodeGroup, DummyNode, EdgeType
 import utils
 
-class CodePropertyGraph:
-    def __init__(self, dir):
-        self.dir = dir
-        self.graph = nx.MultiDiGraph()
-        self.visitor = GraphVisitor()
-        self.logger = logging.getLogger(self.__class__.__name__)
-        
-    def _generate_ast_for_file(self, file_path):
+class ModuleFlows:
+    """
+    CF edges and module-local DF edges generated for one module by a pipeline worker, along with its definitions.
+
+    DF edges that need other modules are left to the parent: `deferred` holds (position in the DF edges, step) pairs,
+    where a step is either an import pair to resolve or the dummy node of a block with a wildcard import, whose
+    liveness depends on the imported module's definitions. Expanding the steps at their positions gives the DF edges
+    in the same order as a serial run.
+    """
+    def __init__(self):
+        self.cf_edges = array("Q")  # flat (source, target) pairs
+        self.df_edges = array("Q")  # flat (source, target) pairs
+        self.deferred = []
+        self.definitions = Definitions()
+    
+    def iter_cf_edges(self):
+        for i in range(0, len(self.cf_edges), 2):
+            yield self.cf_edges[i], self.cf_edges[i + 1], EdgeType.CF
+    
+    def iter_df_edges(self, start=0, end=None):
         """
-        Generate the AST for a single file, returning nodes and edges.
+        Yields the DF edges from position `start` up to `end`, positions counting edges rather than array items.
         """
+        end = len(self.df_edges) // 2 if end is None else end
+        for i in range(2 * start, 2 * end, 2):
+            yield self.df_edges[i], self.df_edges[i + 1], EdgeType.DF
+
+def _generate_module_flows(columns: ASTColumns, df_engine: DataFlowEngine=DataFlowEngine.WALK) -> ModuleFlows:
+    """
+    Generate the CF edges and the DF edges that stay within one module, on a graph of that module alone.
+    """
+    graph = IndexedMultiDiGraph()
+    graph.add_nodes_from(columns.iter_nodes())
+    graph.add_edges_from(columns.iter_edges())
+    flows = ModuleFlows()
+    
+    cf_edges = ControlFlowGraph(graph).generate_control_flow_edges()
+    for source, target, _ in cf_edges:
+        flows.cf_edges.extend((source, target))
+    graph.add_edges_from(cf_edges)
+    
+    dfg = DataFlowGraph(graph, resolve_imports=False, engine=df_engine)
+    dfg.generate_definitions()
+    flows.definitions = dfg.definitions
+    
+    wildcard_blocks = set()
+    for n in GraphVisitor.get_nodes_by_types(graph, TSNodeGroup.IMPORTS):
+        for _, symbol, _ in GraphTreeVisitor.get_import_pairs(graph, n):
+            if symbol and GraphVisitor.get_node_text(graph, symbol) == "*":
+                wildcard_blocks.add(GraphTreeVisitor.get_enclosing_block(graph, n))
+    
+    for n in GraphVisitor.get_nodes_by_type(graph, node_type=TSNodeGroup.DUMMY):
+        if graph.nodes[n]["field_name"] not in [DummyNode.START, DummyNode.ENTRY]:
+            continue
+        if n in wildcard_blocks:
+            flows.deferred.append((len(dfg.df_edges), n))
+        else:
+            dfg.generate_data_flow_edges(blocks=[n])
+            flows.deferred.extend(dfg.unresolved_imports)
+            dfg.unresolved_imports.clear()
+    
+    for source, target, _ in dfg.df_edges:
+        flows.df_edges.extend((source, target))
+    return flows
+
+# Per-process state of AST workers, set once by _init_ast_worker instead of being pickled with every task
+_ast_worker_config = {}
+
+def _init_ast_worker(repo_path, parse_mode: ParseMode, ast_cache: ASTCache, pipeline: bool=False,
+                     df_engine: DataFlowEngine=DataFlowEngine.WALK, definitions_keys: bool=False):
+    _ast_worker_config["repo_path"] = repo_path
+    _ast_worker_config["parse_mode"] = parse_mode
+    _ast_worker_config["ast_cache"] = ast_cache
+    _ast_worker_config["pipeline"] = pipeline
+    _ast_worker_config["df_engine"] = df_engine
+    _ast_worker_config["definitions_keys"] = definitions_keys
+
+def _generate_ast_for_file(file_path):
+    """
+    Generate the AST for a single file in a worker, returning its columns, whether they came from the AST cache,
+    the seconds it took, in pipeline mode the module's flows and with a definitions cache the key of the module's
+    definitions (None otherwise).
+    """
+    logger = logging.getLogger(CodePropertyGraph.__name__)
+    repo_path = _ast_worker_config["repo_path"]
+    ast_cache: ASTCache = _ast_worker_config["ast_cache"]
+    start = time.perf_counter()
+    
+    try:
+        cache_key = None
+        definitions_key = None
+        columns = None
+        if ast_cache or _ast_worker_config["definitions_keys"]:
+            rel_path = utils.get_relative_path(file_path, repo_path)
+            src_bytes = utils.get_file_bytes(".py", file_path)
+            if _ast_worker_config["definitions_keys"]:
+                definitions_key = DefinitionsCache.generate_key(rel_path, src_bytes)
+            if ast_cache:
+                cache_key = ast_cache.generate_key(rel_path, src_bytes)
+                columns = ast_cache.get(cache_key)
+        
+        cache_hit = columns is not None
+        if cache_hit:
+            logger.info(f"AST loaded from cache for file: \033[94m{file_path}\033[0m in {time.perf_counter() - start:.3f}s")
+        else:
+            with AbstractSyntaxTree(repo_path=repo_path, file_path=file_path, parse_mode=_ast_worker_config["parse_mode"]) as ast:
+                columns = ASTColumns.from_nodes_and_edges(*ast.generate_nodes_and_edges(ast.tree.root_node))
+            
+            if cache_key:
+                ast_cache.put(cache_key, columns)
+            logger.info(f"AST generated for file: \033[94m{file_path}\033[0m in {time.perf_counter() - start:.3f}s")
+    except Exception as e:
+        logger.error(f"Error generating AST for file: {file_path}")
+        logger.error(e)
+        return ASTColumns(), False, time.perf_counter() - start, None, None  # Return empty columns on error
+    
+    flows = None
+    if _ast_worker_config["pipeline"]:
         try:
-            ast = AbstractSyntaxTree(repo_path=self.dir, file_path=file_path)
-            nodes, edges = ast.generate_nodes_and_edges(ast.tree.root_node)
-            self.logger.info(f"AST generated for file: \033[94m{file_path}\033[0m")
-            return nodes, edges  # Return nodes and edges instead of modifying graph directly
+            flows = _generate_module_flows(columns, _ast_worker_config["df_engine"])
         except Exception as e:
-            self.logger.error(f"Error generating AST for file: {file_path}")
-            self.logger.error(e)
-            return [], []  # Return empty lists on error
+            logger.error(f"Error generating CF and DF edges for file: {file_path}")
+            logger.error(e)
+    return columns, cache_hit, time.perf_counter() - start, flows, definitions_key
+
+def _generate_asts_for_files(file_paths):
+    return [_generate_ast_for_file(file_path) for file_path in file_paths]
 
+# Read-only state of CFG and DFG workers: the graph, and for DFG workers the definitions and DF engine.
+# Forked workers inherit it from the parent rather than having it pickled to them.
+_block_worker_config = {}
+
+def _generate_cf_edges_for_blocks(blocks: list) -> array:
+    """
+    Generate the CF edges of the given blocks in a CFG worker, returned as flat (source, target) pairs.
+    """
+    cf_edges = array("Q")
+    for source, target, _ in ControlFlowGraph(_block_worker_config["graph"]).generate_control_flow_edges(nodes=blocks):
+        cf_edges.extend((source, target))
+    return cf_edges
+
+def _generate_df_edges_for_blocks(blocks: list) -> array:
+    """
+    Generate the DF edges of the given dummy nodes' blocks in a DFG worker, returned as flat (source, target) pairs.
+    """
+    dfg = DataFlowGraph(_block_worker_config["graph"], engine=_block_worker_config["df_engine"])
+    dfg.definitions = _block_worker_config["definitions"]
+    df_edges = array("Q")
+    for source, target, _ in dfg.generate_data_flow_edges(blocks=blocks):
+        df_edges.extend((source, target))
+    return df_edges
+
+class CodePropertyGraph:
+    def __init__(self, dir, parse_mode: ParseMode=ParseMode.BUFFER, ast_cache: ASTCache=None, workers: int=None,
+                 pipeline: bool=False, lazy_text: bool=False, compact_nodes: bool=False, backend: GraphBackend=GraphBackend.NETWORKX,
+                 df_engine: DataFlowEngine=DataFlowEngine.WALK, definitions_cache: DefinitionsCache=None):
+        self.dir = dir
+        self.workers = workers
+        # In pipeline mode workers also generate CF and module-local DF edges, see ModuleFlows
+        self.pipeline = pipeline
+        self.module_flows = []
+        self.df_engine = df_engine
+        self.parse_mode = parse_mode
+        self.ast_cache = ast_cache
+        self.definitions_cache = definitions_cache
+        self.definitions_keys = {}  # module node -> definitions cache key of the module's source
+        self.file_node_counts = {}  # file path -> (file ID, number of AST nodes generated for it)
+        self._loaded_file_ids = {}  # file ID -> file path holding it
+        self.definitions = None
+        # Compact nodes keep their attributes in shared columns, see NodeRecordStore. The CSR backend always does.
+        if backend == GraphBackend.CSR:
+            self.graph = CSRMultiDiGraph()
+        else:
+            self.graph = CompactMultiDiGraph() if compact_nodes else IndexedMultiDiGraph()
+        if lazy_text:
+            # Nodes keep spans and a file index, their text is read back through GraphVisitor.get_node_text
+            self.graph.graph[SourceStore.GRAPH_KEY] = SourceStore()
+        self.visitor = GraphVisitor()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        
     def generate_asts(self):
         """
         Generate ASTs for all files in the target directory using multiprocessing.
+        
+        Files are handed to workers while the directory is still being walked, largest first, so that one huge file
+        found late does not leave the other workers idle at the end. Small files are batched into a single task.
+        Results are loaded into the graph in discovery order, which keeps the graph independent of scheduling.
+        In pipeline mode the CF edges of each module are loaded along with its AST.
         """
-        file_paths = list(utils.traverse_directory(self.dir, 
-                                                   restrict_extensions=AppConfig.SUPPORTED_FILE_EXTENSIONS, 
-                                                   ignore_dirs=AppConfig.IGNORE_DIRECTORIES))
-
-        # Use ProcessPoolExecutor to fully utilize CPU cores
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            results = executor.map(self._generate_ast_for_file, file_paths)
-
-        # Add nodes and edges to the graph after ASTs are generated
-        for nodes, edges in results:
-            self.graph.add_nodes_from(nodes)
-            self.graph.add_edges_from(edges)
+        max_workers = self.workers or os.cpu_count() or 1
+        discovered = utils.traverse_directory(self.dir, 
+                                              restrict_extensions=AppConfig.SUPPORTED_FILE_EXTENSIONS, 
+                                              ignore_dirs=AppConfig.IGNORE_DIRECTORIES)
+        file_paths = []  # discovery order
+        pending = []  # max-heap of (-size, discovery index, file path)
+        results = {}  # discovery index -> (columns, cache hit, seconds)
+        timings = []
+        self._loaded_file_ids = {}
+        
+        def discover(limit):
+            count = 0
+            for file_path in itertools.islice(discovered, limit):
+                try:
+                    size = os.path.getsize(file_path)
+                except OSError:
+                    size = 0
+                heapq.heappush(pending, (-size, len(file_paths), file_path))
+                file_paths.append(file_path)
+                count += 1
+            return count
+        
+        def next_batch():
+            neg_size, index, file_path = heapq.heappop(pending)
+            batch, batch_size = [(index, file_path)], -neg_size
+            while pending and batch_size - pending[0][0] <= AppConfig.AST_BATCH_BYTES:
+                neg_size, index, file_path = heapq.heappop(pending)
+                batch.append((index, file_path))
+                batch_size -= neg_size
+            return batch
+        
+        # Use ProcessPoolExecutor to fully utilize CPU cores, workers are configured once by the initializer
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, 
+                                                    initializer=_init_ast_worker, 
+                                                    initargs=(self.dir, self.parse_mode, self.ast_cache, self.pipeline, self.df_engine,
+                                                              self.definitions_cache is not None)) as executor:
+            in_flight = {}
+            exhausted = False
+            loaded = 0
+            
+            while True:
+                if not exhausted:
+                    exhausted = discover(AppConfig.AST_DISCOVERY_BATCH) < AppConfig.AST_DISCOVERY_BATCH
+                
+                while pending and len(in_flight) < 2 * max_workers:
+                    batch = next_batch()
+                    in_flight[executor.submit(_generate_asts_for_files, [file_path for _, file_path in batch])] = batch
+                
+                if not in_flight:
+                    if exhausted:
+                        break
+                    continue
+                
+                # Only block on workers once there is nothing left to discover
+                done, _ = concurrent.futures.wait(in_flight, timeout=None if exhausted else 0,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    for (index, _), result in zip(batch, future.result()):
+                        results[index] = result
+                
+                # Add nodes and edges to the graph in discovery order as the ASTs come back
+                while loaded in results:
+                    columns, cache_hit, seconds, flows, definitions_key = results.pop(loaded)
+                    self._load_ast(file_paths[loaded], columns, cache_hit, flows, definitions_key)
+                    timings.append((seconds, file_paths[loaded]))
+                    loaded += 1
+        
+        slowest = heapq.nlargest(AppConfig.AST_SLOWEST_FILES_LOGGED, timings)
+        if slowest:
+            self.logger.info("Slowest AST files: " + ", ".join(f"\033[94m{file_path}\033[0m ({seconds:.3f}s)" for seconds, file_path in slowest))
+        
+        if self.ast_cache:
+            self.ast_cache.log_stats()
+            self.ast_cache.evict()
+    
+    def _load_ast(self, file_path, columns: ASTColumns, cache_hit: bool, flows: ModuleFlows=None, definitions_key: str=None):
+        if self.ast_cache:
+            self.ast_cache.record(cache_hit)
+        
+        if len(columns):
+            path_file_id, _ = utils.unpack_node_id(columns.ids[0])
+            file_id = self.claim_file_id(file_path, path_file_id)
+            if file_id != path_file_id:
+                self.logger.warning(f"File ID collision between {self._loaded_file_ids.get(path_file_id)} and {file_path}, "
+                                    f"using file ID {file_id} for the latter.")
+                columns.set_file_id(file_id)
+                # Cached definitions and the worker's flows hold the path derived IDs
+                definitions_key = None
+                if flows is not None:
+                    flows = _generate_module_flows(columns, self.df_engine)
+            self.file_node_counts[file_path] = (file_id, len(columns))
+            if definitions_key:
+                # The module node comes first in pre-order
+                self.definitions_keys[columns.ids[0]] = definitions_key
+        
+        sources: SourceStore = self.graph.graph.get(SourceStore.GRAPH_KEY)
+        if sources is not None and len(columns):
+            file_index = sources.add(file_path, columns.strings[columns.modules[0]])
+            self.graph.add_nodes_from(columns.iter_nodes(file_index))
+        else:
+            self.graph.add_nodes_from(columns.iter_nodes())
+        self.graph.add_edges_from(columns.iter_edges())
+        
+        if flows is not None:
+            self.graph.add_edges_from(flows.iter_cf_edges())
+            # DF edges wait for generate_dfgs, as wildcard import blocks must be walked without them
+            self.module_flows.append(flows)
+            
+    def claim_file_id(self, file_path, file_id: int) -> int:
+        """
+        The file ID of a file: the one it already holds, else its path derived `file_id` or, when another file holds
+        that, the next free ID after it. Files are loaded in discovery order, so collisions resolve the same way
+        on every run over the same tree.
+        """
+        if file_path in self.file_node_counts:
+            return self.file_node_counts[file_path][0]
+        
+        for probe in range(1 << utils.NODE_ORDINAL_BITS):
+            candidate = (file_id + probe) & utils.NODE_ORDINAL_MASK
+            owner = self._loaded_file_ids.get(candidate)
+            if owner is None or owner == file_path:
+                self._loaded_file_ids[candidate] = file_path
+                return candidate
+        raise RuntimeError(f"No free file ID left for file: {file_path}")
+    
+    def release_file_id(self, file_path):
+        file_id, _ = self.file_node_counts.get(file_path, (None, 0))
+        if self._loaded_file_ids.get(file_id) == file_path:
+            del self._loaded_file_ids[file_id]
+    
+    def get_file_node_ids(self, file_path):
+        """
+        IDs of the AST nodes generated for a file. Ordinals are contiguous from 1, so they are rebuilt from the count.
+        """
+        file_id, node_count = self.file_node_counts.get(file_path, (None, 0))
+        return [utils.pack_node_id(file_id, ordinal) for ordinal in range(1, node_count + 1)]
             
     def generate_cfgs(self):
         """
-        Generate Control Flow edges.
+        Generate Control Flow edges. In pipeline mode they were already generated by the AST workers.
         """
+        if self.pipeline:
+            return
+        
         try:
             cfg = ControlFlowGraph(self.graph)
-            edges = cfg.generate_control_flow_edges()
+            # Blocks come by type, modules first, and are handed to workers by file
+            blocks = self._order_blocks_by_file(cfg.get_blocks())
+            block_workers = self._plan_block_workers(blocks)
+            if block_workers is None:
+                edges = cfg.generate_control_flow_edges(nodes=blocks)
+            else:
+                edges = self._generate_edges_in_workers(_generate_cf_edges_for_blocks, *block_workers, EdgeType.CF)
             self.graph.add_edges_from(edges)
         except Exception as e:
             self.logger.error(f"Error generating CFG: {e}")
     
+    def _get_block_executor(self, max_workers: int):
+        """
+        Forked processes where fork is available, otherwise None to run serially. Threads are not used even on
+        free-threaded builds: reads of the graph update shared caches (AST descendants, lazy text buffers).
+        """
+        if "fork" in multiprocessing.get_all_start_methods():
+            return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"))
+        return None
+    
+    @staticmethod
+    def _order_blocks_by_file(blocks: list) -> list:
+        """
+        The blocks grouped by file, files in the order of their first block and blocks of a file in their given order.
+        """
+        blocks_by_file = {}
+        for n in blocks:
+            blocks_by_file.setdefault(utils.unpack_node_id(n)[0], []).append(n)
+        return list(itertools.chain.from_iterable(blocks_by_file.values()))
+    
+    @staticmethod
+    def _split_blocks_by_module(blocks: list, task_count: int) -> list:
+        """
+        Split blocks, ordered by file as by _order_blocks_by_file, into at most `task_count` runs of whole modules
+        with about as many blocks each. The runs keep the order of `blocks`, so their results concatenated come in
+        the serial order.
+        """
+        task_size = -(-len(blocks) // task_count)
+        tasks, task = [], []
+        for _, module_blocks in itertools.groupby(blocks, key=lambda n: utils.unpack_node_id(n)[0]):
+            task.extend(module_blocks)
+            if len(task) >= task_size:
+                tasks.append(task)
+                task = []
+        if task:
+            tasks.append(task)
+        return tasks
+    
+    def _plan_block_workers(self, blocks: list):
+        """
+        The (executor, tasks) to generate edges of the given blocks with, a few modules per task. Returns None when
+        there is a single worker or task, or no way to run workers, to run serially instead.
+        """
+        max_workers = self.workers or os.cpu_count() or 1
+        tasks = self._split_blocks_by_module(blocks, max_workers * 4) if max_workers > 1 else []
+        executor = self._get_block_executor(max_workers) if len(tasks) > 1 else None
+        if executor is None:
+            return None
+        return executor, tasks
+    
+    def _generate_edges_in_workers(self, worker_fn, executor, tasks: list, edge_type: str, **worker_config):
+        """
+        Generate edges of one type for the tasks of _plan_block_workers with `worker_fn`. Blocks only read the graph
+        (and the definitions), so they are independent of each other. Results are collected in task order, which
+        gives the edges in the same order as a serial run.
+        """
+        build_layers = getattr(self.graph, "build_layers", None)
+        if build_layers is not None:
+            build_layers()
+        
+        _block_worker_config.update(graph=self.graph, **worker_config)
+        try:
+            with executor:
+                edges = []
+                for flat_edges in executor.map(worker_fn, tasks):
+                    edges.extend((flat_edges[i], flat_edges[i + 1], edge_type) for i in range(0, len(flat_edges), 2))
+        finally:
+            _block_worker_config.clear()
+        return edges
+    
     def generate_dfgs(self):
         """
-        Generate Data Flow edges.
+        Generate Data Flow edges. Once the definitions are generated, blocks are handed to workers like in
+        generate_cfgs.
         """
+        if self.pipeline:
+            return self.merge_module_flows()
+        
         try:
-            dfg = DataFlowGraph(self.graph)
+            dfg = DataFlowGraph(self.graph, engine=self.df_engine, definitions_cache=self.definitions_cache,
+                                definitions_keys=self.definitions_keys)
             dfg.generate_definitions()
-            edges = dfg.generate_data_flow_edges()
+            self.definitions = dfg.definitions
+            
+            # Dummy nodes are AST nodes, so they already come file by file
+            blocks = GraphVisitor.get_nodes_by_type(self.graph, node_type=TSNodeGroup.DUMMY)
+            block_workers = self._plan_block_workers(blocks)
+            if block_workers is None:
+                edges = dfg.generate_data_flow_edges(blocks=blocks)
+            else:
+                if self.definitions_cache:
+                    # Workers share the definitions read-only, so modules are loaded before they start
+                    dfg.definitions.load_all()
+                edges = self._generate_edges_in_workers(_generate_df_edges_for_blocks, *block_workers, EdgeType.DF,
+                                                        definitions=dfg.definitions, df_engine=self.df_engine)
             self.graph.add_edges_from(edges)
+            
+            if self.definitions_cache:
+                self.definitions_cache.log_stats()
+                self.definitions_cache.evict()
         except Exception as e:
             self.logger.error(f"Error generating DFG: {e}") 
            
-    def export(self, output_path):
+    def merge_module_flows(self):
+        """
+        Add the DF edges generated by pipeline workers, resolving what needed other modules on the merged graph:
+        import edges against the definitions of all modules, and the blocks with wildcard imports.
+        """
+        try:
+            dfg = DataFlowGraph(self.graph, engine=self.df_engine)
+            for flows in self.module_flows:
+                dfg.definitions.table.update(flows.definitions.table)
+            self.definitions = dfg.definitions
+            
+            for flows in self.module_flows:
+                position = 0
+                for step_position, step in flows.deferred:
+                    dfg.df_edges.extend(flows.iter_df_edges(position, step_position))
+                    position = step_position
+                    if isinstance(step, tuple):
+                        dfg.df_edges.extend(dfg.generate_import_edges(step))
+                    else:
+                        dfg.generate_data_flow_edges(blocks=[step])
+                dfg.df_edges.extend(flows.iter_df_edges(position))
+            
+            self.module_flows = []
+            self.graph.add_edges_from(dfg.df_edges)
+        except Exception as e:
+            self.logger.error(f"Error generating DFG: {e}")
+    
+    def legacy_id_mapping(self) -> dict:
+        """
+        Map integer node IDs to the legacy string IDs (SHA-256 of path, type and byte span).
+        Dummy nodes hash the type of their owning block, as they did before integer IDs.
+        """
+        mapping = {}
+        for n, n_data in self.graph.nodes(data=True):
+            node_type = n_data["type"]
+            dummy_str = None
+            if node_type == TSNodeGroup.DUMMY:
+                owner = self.visitor.get_parent(self.graph, n, EdgeType.AST)
+                node_type = self.visitor.get_node_by_id(self.graph, owner)["type"]
+                dummy_str = n_data["field_name"]
+            
+            start_byte, end_byte = n_data["src_bytes_range"]
+            mapping[n] = utils.generate_legacy_node_id(self.visitor.get_node_module(self.graph, n), node_type, start_byte, end_byte, dummy_str)
+        
+        return mapping
+           
+    def to_adjacency_bundle(self, legacy_ids: bool=True) -> AdjacencyBundle:
+        """
+        Convert the graph to per edge type CSR arrays and vocabulary coded node feature columns.
+        """
+        nodes = list(self.graph)
+        
+        columns, vocabularies = {}, {}
+        for column in AdjacencyBundle.FEATURE_COLUMNS:
+            if column == "module":
+                # Not stored on nodes in lazy text mode
+                values = [self.visitor.get_node_module(self.graph, n) for n in nodes]
+            else:
+                values = [value for _, value in self.graph.nodes(data=column)]
+            columns[column], vocabularies[column] = AdjacencyBundle.encode_column(values)
+        
+        edges = {}
+        if isinstance(self.graph, CSRMultiDiGraph):
+            # Node indexes of the CSR backend already follow graph order
+            for edge_type, layer in self.graph.layers.items():
+                layer.build()
+                edges[edge_type] = AdjacencyBundle.group_edges(layer.sources, layer.targets, len(nodes))
+        else:
+            index = {n: i for i, n in enumerate(nodes)}
+            edge_lists = {}  # edge type -> (source numbers, target numbers)
+            for u, v, edge_type in self.graph.edges(keys=True):
+                sources, targets = edge_lists.setdefault(edge_type, (array("I"), array("I")))
+                sources.append(index[u])
+                targets.append(index[v])
+            for edge_type, (sources, targets) in edge_lists.items():
+                edges[edge_type] = AdjacencyBundle.group_edges(np.array(sources, dtype=np.uint32),
+                                                               np.array(targets, dtype=np.uint32), len(nodes))
+        
+        mapping = self.legacy_id_mapping() if legacy_ids else None
+        return AdjacencyBundle(node_ids=np.array(nodes, dtype=np.uint64), columns=columns, vocabularies=vocabularies, edges=edges,
+                               legacy_ids=np.array([mapping[n] for n in nodes], dtype=str) if legacy_ids else None)
+    
+    def export(self, output_path, legacy_ids: bool=True):
         # Create the base folder if it does not exist
         base_folder = os.path.dirname(output_path)
         if not os.path.exists(base_folder):
@@ -83,7 +566,24 @@ class CodePropertyGraph:
         if file_extension == 'json':
             # Convert the graph to a dictionary
             data = nx.readwrite.json_graph.node_link_data(self.graph)
+            sources: SourceStore = self.graph.graph.get(SourceStore.GRAPH_KEY)
+            if sources is not None:
+                # Write lazy text mode nodes out in full, the source store itself is not part of the export
+                data["graph"] = {key: value for key, value in data["graph"].items() if key != SourceStore.GRAPH_KEY}
+                for i, node in enumerate(data["nodes"]):
+                    if SourceStore.FILE_INDEX in node:
+                        node_id = node.pop("id")
+                        data["nodes"][i] = {**sources.materialize(node), "id": node_id}
+            if legacy_ids:
+                mapping = self.legacy_id_mapping()
+                for node in data["nodes"]:
+                    node["id"] = mapping[node["id"]]
+                for link in data["links"]:
+                    link["source"] = mapping[link["source"]]
+                    link["target"] = mapping[link["target"]]
             with open(output_path, 'w') as f:
                 json.dump(data, f, indent=2)
+        elif file_extension == 'npz':
+            self.to_adjacency_bundle(legacy_ids=legacy_ids).save(output_path)
         else:
-            raise NotImplementedError(f"Unsupported file format: {file_extension}, current supported format is .json")
\ No newline at end of file
+            raise NotImplementedError(f"Unsupported file format: {file_extension}, current supported formats are .json and .npz")
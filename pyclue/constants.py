@@ -1,11 +1,49 @@
 import logging
+from enum import Enum
 from tree_sitter import Language
 import tree_sitter_python as tspython
 
 class AppConfig:
+    VERSION = "0.1.0"
+    AST_CACHE_MAX_SIZE_MB = 1024
+    AST_BATCH_BYTES = 256 * 1024 # small files are batched into one AST task up to this many bytes
+    AST_DISCOVERY_BATCH = 256 # files discovered between checks on running AST tasks
+    AST_SLOWEST_FILES_LOGGED = 5
+    LAZY_TEXT_OPEN_FILES = 64 # memory-mapped files kept open at once in lazy text mode
+    LAZY_TEXT_CACHE_SIZE = 1 << 16 # distinct texts interned in lazy text mode before the cache is reset
+    AST_DESCENDANTS_CACHE_SIZE = 1 << 16 # (node, type) descendant lists kept by an indexed graph, least recently used go first
     SUPPORTED_FILE_EXTENSIONS = [".py"]
     IGNORE_DIRECTORIES = [".github", ".git", ".venv", "__pycache__"]
     
+class ParseMode(str, Enum):
+    """
+    How source bytes are handed to the tree-sitter parser
+    """
+    CALLBACK = "callback" # one read callback call per byte
+    BUFFER = "buffer" # whole file buffer in a single call
+    MMAP = "mmap" # memory-mapped file buffer
+    
+class ExportFormat(str, Enum):
+    """
+    File format of the exported CPG
+    """
+    JSON = "json" # networkx node-link JSON
+    NPZ = "npz" # NumPy arrays, see AdjacencyBundle
+    
+class GraphBackend(str, Enum):
+    """
+    Graph implementation the CPG is built in
+    """
+    NETWORKX = "networkx" # networkx MultiDiGraph with lookup indexes
+    CSR = "csr" # append-only, node attribute columns and compressed sparse row edges per edge type
+    
+class DataFlowEngine(str, Enum):
+    """
+    How DF edges are derived from the CF layer
+    """
+    WALK = "walk" # single pass over the CF walker with text keyed liveness
+    REACHING_DEFINITIONS = "reaching_definitions" # gen/kill bitsets iterated to a fixed point
+    
 class AppLogger:
     LOGGING_LEVEL = logging.INFO
     LOGGING_FORMAT = "%(asctime)s-%(process)d [%(levelname)s] %(name)s: %(message)s"
@@ -19,11 +19,24 @@ class ControlFlowGraph:
         self.logger = logging.getLogger(self.__class__.__name__)
         self.cf_edges = []
         
-    def generate_control_flow_edges(self):
+    def get_blocks(self) -> list:
+        """
+        Module, class and function nodes of the graph, from its type index when it has one.
+        """
+        return list(GraphVisitor().get_nodes_by_types(self.graph, [TSNodeGroup.MODULE, TSNodeGroup.CLS_NODE, TSNodeGroup.FN_NODE]))
+    
+    def generate_control_flow_edges(self, nodes=None):
+        """
+        Generate CF edges for every module, class and function block, or only for the blocks among `nodes` when given.
+        """
         def log(block_type, block_name):
             self.logger.info(f"CF generated for \033[92m{block_type}\033[0m: \033[94m{block_name}\033[0m")
         
-        for n, n_type in self.graph.nodes(data="type"):
+        if nodes is None:
+            nodes = self.get_blocks()
+        candidates = ((n, GraphVisitor().get_node_by_id(self.graph, n)["type"]) for n in nodes)
+        
+        for n, n_type in candidates:
             try:
                 if n_type in TSNodeGroup.MODULE:
                     module_s = self.get_module_seq(n)
@@ -34,12 +47,12 @@ class ControlFlowGraph:
                     cls_s = self.get_cls_seq(n)
                     cls_s.generate_edges(EdgeType.CF)
                     self.cf_edges.extend(cls_s.edges)
-                    log(n_type, GraphVisitor().get_node_by_id(self.graph, GraphVisitor().get_child_by_field_name(self.graph, n, "name"))["text"])
+                    log(n_type, GraphVisitor().get_node_text(self.graph, GraphVisitor().get_child_by_field_name(self.graph, n, "name")))
                 elif n_type == TSNodeGroup.FN_NODE:
                     fn_s = self.get_fn_seq(n)
                     fn_s.generate_edges(EdgeType.CF)
                     self.cf_edges.extend(fn_s.edges)
-                    log(n_type, GraphVisitor().get_node_by_id(self.graph, GraphVisitor().get_child_by_field_name(self.graph, n, "name"))["text"])
+                    log(n_type, GraphVisitor().get_node_text(self.graph, GraphVisitor().get_child_by_field_name(self.graph, n, "name")))
             except Exception as e:
                 self.logger.warning(f"Failed to generate CF edges for block {n} of type {n_type}.")
                 self.logger.warning(f"Warning Message: {e}")
@@ -0,0 +1,357 @@
+from array import array
+
+import numpy as np
+import networkx as nx
+
+import utils
+from constants import EdgeType, TSNodeGroup
+from node_records import NodeRecordStore, NodeRecord
+
+EMPTY_INDEXES = np.zeros(0, dtype=np.uint32)
+
+class CSREdgeLayer:
+    """
+    Edges of one type in compressed sparse row form, over node indexes.
+
+    Edges are kept in insertion order (sources, targets) and, for neighbour queries, grouped by source node
+    (offsets, successors) and by target node (pred_offsets, predecessors), each group in insertion order.
+    New edges are buffered and merged into the arrays on the next query, duplicates keep their first position.
+    """
+    __slots__ = ("sources", "targets", "offsets", "successors", "pred_offsets", "predecessors", "pending")
+
+    def __init__(self):
+        self.sources = np.zeros(0, dtype=np.uint32)
+        self.targets = np.zeros(0, dtype=np.uint32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.successors = self.targets
+        self.pred_offsets = self.offsets
+        self.predecessors = self.sources
+        self.pending = array("I")  # source, target index pairs not merged yet
+
+    def __len__(self):
+        self.build()
+        return len(self.sources)
+
+    def add(self, u: int, v: int):
+        self.pending.append(u)
+        self.pending.append(v)
+
+    def build(self):
+        if not self.pending:
+            return
+
+        pending = np.frombuffer(self.pending, dtype=np.uint32).reshape(-1, 2)
+        sources = np.concatenate([self.sources, pending[:, 0]])
+        targets = np.concatenate([self.targets, pending[:, 1]])
+        del pending
+        self.pending = array("I")
+
+        # Drop repeated edges, keeping the first of each in place
+        _, first = np.unique((sources.astype(np.uint64) << np.uint64(32)) | targets, return_index=True)
+        if len(first) < len(sources):
+            first.sort()
+            sources, targets = sources[first], targets[first]
+        self.sources, self.targets = sources, targets
+
+        node_count = int(max(sources.max(), targets.max())) + 1 if len(sources) else 0
+        self.offsets, self.successors = self._group(sources, targets, node_count)
+        self.pred_offsets, self.predecessors = self._group(targets, sources, node_count)
+
+    @staticmethod
+    def _group(keys, values, node_count):
+        order = np.argsort(keys, kind="stable")
+        offsets = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=node_count), out=offsets[1:])
+        return offsets, values[order]
+
+    def get_successors(self, index: int):
+        self.build()
+        if index + 1 >= len(self.offsets):
+            return EMPTY_INDEXES
+        return self.successors[self.offsets[index]:self.offsets[index + 1]]
+
+    def get_predecessors(self, index: int):
+        self.build()
+        if index + 1 >= len(self.pred_offsets):
+            return EMPTY_INDEXES
+        return self.predecessors[self.pred_offsets[index]:self.pred_offsets[index + 1]]
+
+class CSRNodeView:
+    """
+    The subset of networkx's NodeView used on CPGs: G.nodes[n], G.nodes(data=...), iteration and membership.
+    """
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph: "CSRMultiDiGraph"):
+        self._graph = graph
+
+    def __getitem__(self, n) -> NodeRecord:
+        return NodeRecord(self._graph.records, self._graph.get_index(n))
+
+    def __call__(self, data=False, default=None):
+        G = self._graph
+        if data is False:
+            return iter(G)
+        if data is True:
+            return ((G.get_node(i), NodeRecord(G.records, i)) for i in range(len(G)))
+        return ((G.get_node(i), NodeRecord(G.records, i).get(data, default)) for i in range(len(G)))
+
+    def get(self, n, default=None):
+        return self[n] if n in self._graph else default
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, n):
+        return n in self._graph
+
+class CSRMultiDiGraph:
+    """
+    Append-only directed multigraph with integer-indexed nodes, an alternative to IndexedMultiDiGraph for large repositories.
+
+    Node attributes live in a NodeRecordStore and edges in one CSREdgeLayer per edge key, so the graph costs a few
+    bytes per node and edge instead of the dicts networkx keeps for each. Packed node IDs of a file added in
+    ordinal order map to their index arithmetically; other node IDs go through a dict.
+    It supports the parts of the networkx MultiDiGraph interface pyclue uses plus the lookups of
+    IndexedMultiDiGraph, which GraphVisitor uses when IndexedMultiDiGraph.indexes_of accepts the graph.
+    Edges carry no attributes. The graph is append-only: removing nodes or edges raises TypeError, so graphs that
+    are updated in place, as in incremental (watch) mode, need the networkx backend.
+    """
+    keeps_indexes = True
+
+    def __init__(self):
+        self.graph = {}
+        self.records = NodeRecordStore()
+        self.node_ids = array("Q")  # index -> node ID, 0 for nodes in other_node_ids
+        self.other_node_ids = {}  # index -> node ID that is not a packed ID
+        self.file_spans = {}  # file ID -> [index of ordinal 1, ordinals added]
+        self.other_indexes = {}  # node ID -> index, for nodes not in file_spans
+        self.layers = {}  # edge key -> CSREdgeLayer
+
+    @property
+    def nodes(self) -> CSRNodeView:
+        return CSRNodeView(self)
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return True
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __iter__(self):
+        return (self.get_node(i) for i in range(len(self.node_ids)))
+
+    def __contains__(self, n):
+        try:
+            self.get_index(n)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def has_node(self, n):
+        return n in self
+
+    def number_of_nodes(self):
+        return len(self)
+
+    def number_of_edges(self):
+        return sum(len(layer) for layer in self.layers.values())
+
+    def get_index(self, n) -> int:
+        if type(n) is int and 0 <= n < (1 << 64):
+            file_id, ordinal = utils.unpack_node_id(n)
+            span = self.file_spans.get(file_id)
+            if span is not None and 0 < ordinal <= span[1]:
+                return span[0] + ordinal - 1
+        return self.other_indexes[n]
+
+    def get_node(self, index: int):
+        if self.other_node_ids:
+            n = self.other_node_ids.get(index)
+            if n is not None:
+                return n
+        return self.node_ids[index]
+
+    def _get_nodes(self, indexes) -> list:
+        if self.other_node_ids:
+            return [self.get_node(i) for i in indexes.tolist()]
+        node_ids = self.node_ids
+        return [node_ids[i] for i in indexes.tolist()]
+
+    def _new_index(self, n) -> int:
+        index = len(self.node_ids)
+        file_id = ordinal = None
+        if type(n) is int and 0 <= n < (1 << 64):
+            file_id, ordinal = utils.unpack_node_id(n)
+        span = self.file_spans.get(file_id)
+
+        if file_id is not None and span is None and ordinal == 1:
+            self.file_spans[file_id] = [index, 1]
+        elif span is not None and ordinal == span[1] + 1 and span[0] + span[1] == index:
+            span[1] += 1
+        else:
+            self.other_indexes[n] = index
+
+        if file_id is not None:
+            self.node_ids.append(n)
+        else:
+            self.node_ids.append(0)
+            self.other_node_ids[index] = n
+        record = self.records.new_record()
+        return record.index
+
+    def _get_or_add_index(self, n) -> int:
+        try:
+            return self.get_index(n)
+        except KeyError:
+            return self._new_index(n)
+
+    def add_node(self, node_for_adding, **attr):
+        index = self._get_or_add_index(node_for_adding)
+        NodeRecord(self.records, index).update(attr)
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        for node_for_adding in nodes_for_adding:
+            try:
+                hash(node_for_adding)
+                n, n_data = node_for_adding, {}
+            except TypeError:
+                # a (node, attribute dict) pair
+                n, n_data = node_for_adding
+            self.add_node(n, **{**attr, **n_data})
+
+    def add_edge(self, u_for_edge, v_for_edge, key=None, **attr):
+        if key is None or attr:
+            raise ValueError("CSRMultiDiGraph edges need a key and can not have attributes.")
+        u = self._get_or_add_index(u_for_edge)
+        v = self._get_or_add_index(v_for_edge)
+        layer = self.layers.get(key)
+        if layer is None:
+            layer = self.layers[key] = CSREdgeLayer()
+        layer.add(u, v)
+        return key
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        for e in ebunch_to_add:
+            u, v, key, *data = e
+            self.add_edge(u, v, key, **attr, **(data[0] if data else {}))
+
+    @staticmethod
+    def _append_only_error() -> TypeError:
+        return TypeError("CSRMultiDiGraph is append-only, use the networkx backend to remove nodes or edges.")
+
+    def remove_node(self, n):
+        raise self._append_only_error()
+
+    def remove_nodes_from(self, nodes):
+        raise self._append_only_error()
+
+    def remove_edge(self, u, v, key=None):
+        raise self._append_only_error()
+
+    def build_layers(self):
+        """
+        Merge buffered edges now rather than on the next query, e.g. before worker processes are forked so that
+        each does not merge them again.
+        """
+        for layer in self.layers.values():
+            layer.build()
+
+    def has_edge(self, u, v, key=None):
+        try:
+            u_index, v_index = self.get_index(u), self.get_index(v)
+        except KeyError:
+            return False
+        layers = self.layers.values() if key is None else [self.layers.get(key)]
+        return any(layer is not None and v_index in layer.get_successors(u_index) for layer in layers)
+
+    def _neighbours(self, n, successors: bool) -> list:
+        index = self.get_index(n)
+        neighbours = {}
+        for layer in self.layers.values():
+            indexes = layer.get_successors(index) if successors else layer.get_predecessors(index)
+            for i in indexes.tolist():
+                neighbours[i] = None
+        return [self.get_node(i) for i in neighbours]
+
+    def successors(self, n):
+        return iter(self._neighbours(n, successors=True))
+
+    def predecessors(self, n):
+        return iter(self._neighbours(n, successors=False))
+
+    def edges(self, keys=False, data=False):
+        """
+        Yields edges like MultiDiGraph.edges: by source node, then by target node in the order each was first
+        connected, then by key.
+        """
+        for index in range(len(self)):
+            u = self.get_node(index)
+            targets = {}  # target index -> keys
+            for key, layer in self.layers.items():
+                for i in layer.get_successors(index).tolist():
+                    targets.setdefault(i, []).append(key)
+            for i, edge_keys in targets.items():
+                v = self.get_node(i)
+                for key in edge_keys:
+                    edge = (u, v, key) if keys else (u, v)
+                    yield (*edge, {}) if data else edge
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        """
+        Copy into a networkx MultiDiGraph with a dict per node, e.g. for networkx drawing functions.
+        """
+        G = nx.MultiDiGraph()
+        G.graph.update(self.graph)
+        G.add_nodes_from((n, dict(n_data)) for n, n_data in self.nodes(data=True))
+        G.add_edges_from(self.edges(keys=True))
+        return G
+
+    # Lookups of IndexedMultiDiGraph
+
+    def get_successors_by_edge_type(self, node, edge_type) -> list:
+        layer = self.layers.get(edge_type)
+        if layer is None:
+            return []
+        return self._get_nodes(layer.get_successors(self.get_index(node)))
+
+    def get_predecessors_by_edge_type(self, node, edge_type) -> list:
+        layer = self.layers.get(edge_type)
+        if layer is None:
+            return []
+        return self._get_nodes(layer.get_predecessors(self.get_index(node)))
+
+    def get_ast_children_by_field_name(self, node, field_name) -> list:
+        return [n for n in self.get_successors_by_edge_type(node, EdgeType.AST) if self.nodes[n].get("field_name") == field_name]
+
+    def get_ast_children_by_type(self, node, node_type) -> list:
+        return [n for n in self.get_successors_by_edge_type(node, EdgeType.AST) if self.nodes[n].get("type") == node_type]
+
+    def get_nodes_by_type(self, node_type) -> list:
+        code = self.records._string_codes.get(node_type)
+        if code is None:
+            return []
+        type_codes = np.array(self.records.columns["type"], dtype=np.uint32)
+        indexes = np.flatnonzero(type_codes == code).tolist()
+        if node_type is None:
+            # Code 0 is also left in the column by records without a type or with a non-string one
+            indexes = [i for i in indexes if NodeRecord(self.records, i).get("type") is None]
+        return [self.get_node(i) for i in indexes]
+
+    def get_dummy_nodes_by_field_name(self, field_name) -> list:
+        return [n for n in self.get_nodes_by_type(TSNodeGroup.DUMMY) if self.nodes[n].get("field_name") == field_name]
+
+    def get_ast_descendants_by_type(self, node, node_type) -> list:
+        descendants = []
+        queue = [node]
+        for current_node in queue:  # the queue grows while it is iterated
+            if self.nodes[current_node].get("type") == node_type:
+                descendants.append(current_node)
+            queue.extend(self.get_successors_by_edge_type(current_node, EdgeType.AST))
+        return descendants
@@ -1,8 +1,9 @@
 import logging
 import networkx as nx
 
-from visitor import GraphVisitor, GraphTreeVisitor
-from constants import TSNodeGroup, DummyNode, EdgeType
+from visitor import GraphVisitor, GraphTreeVisitor, NXAlgorithms
+from constants import TSNodeGroup, DummyNode, EdgeType, DataFlowEngine
+from definitions_cache import DefinitionsCache
 from utils import module_path_to_dotted_name
 
 class Definitions:
@@ -24,6 +25,48 @@ class Definitions:
     def get(self, text: str):
         return self.table.get(text)
     
+    def remove(self, text: str):
+        self.table.pop(text, None)
+    
+class ModuleDefinitions(Definitions):
+    """
+    Definitions of modules whose children tables are made on first lookup, by an import, a wildcard expansion or
+    the constants preloaded into a block, instead of all up front.
+    
+    Every block preloads the constants of its own module, so a full build still loads every module that has blocks;
+    there the definitions cache saves the work, not the laziness. Only modules that no processed block belongs to or
+    imports are never loaded.
+    """
+    def __init__(self, load_children):
+        super().__init__()
+        self.pending = {}  # module text -> module node whose children are not loaded yet
+        self.load_children = load_children  # module node -> children Definitions, or None when they failed
+        
+    def add_pending(self, text: str, module):
+        self.table.pop(text, None)
+        self.pending[text] = module
+        
+    def add(self, text: str, node_id: str):
+        self.pending.pop(text, None)
+        super().add(text, node_id)
+        
+    def get(self, text: str):
+        module = self.pending.pop(text, None)
+        if module is not None:
+            self.add(text, module)
+            children = self.load_children(module)
+            if children is not None:
+                self.add_children(text, children)
+        return self.table.get(text)
+    
+    def remove(self, text: str):
+        self.pending.pop(text, None)
+        super().remove(text)
+    
+    def load_all(self):
+        for text in list(self.pending):
+            self.get(text)
+    
 class FlowLiveness:
     def __init__(self):
         self.table = {}
@@ -41,61 +84,161 @@ class FlowLiveness:
     def get(self, text: str):
         return self.table.get(text)
 
+class FlowDefinitions:
+    """
+    Definitions made by one CF node, as (text, node ID) pairs in order. Stands in for FlowLiveness when the
+    reaching definitions engine collects what each node defines.
+    """
+    def __init__(self):
+        self.pairs = []
+        
+    def add(self, text: str, node_id: str):
+        self.pairs.append((text, node_id))
+
+class DefinitionBitsets:
+    """
+    Definitions of one CF region numbered in the order they are added, for sets of definitions kept as Python int
+    bitsets: bit i is set when definition i is in the set. Definitions of the same text kill each other.
+    """
+    def __init__(self):
+        self.def_nodes = []  # definition number -> defining node
+        self.numbers = {}  # (text, defining node) -> definition number
+        self.masks_by_text = {}  # text -> bits of all definitions of that text
+        
+    def add(self, text: str, node_id) -> int:
+        number = self.numbers.get((text, node_id))
+        if number is None:
+            number = self.numbers[(text, node_id)] = len(self.def_nodes)
+            self.def_nodes.append(node_id)
+            self.masks_by_text[text] = self.masks_by_text.get(text, 0) | (1 << number)
+        return number
+    
+    def get_gen_and_kill(self, numbered_pairs: list) -> tuple[int, int]:
+        """
+        Gen and kill bits of a node making the given (text, definition number) definitions in order, a later
+        definition of a text shadowing the earlier ones. Needs the masks of all definitions of the region.
+        """
+        gen = kill = 0
+        for text, number in numbered_pairs:
+            mask = self.masks_by_text[text]
+            gen = (gen & ~mask) | (1 << number)
+            kill |= mask
+        return gen, kill
+    
+    def get_def_nodes(self, bits: int, text: str) -> list:
+        """
+        Defining nodes of the definitions of a text among the bits, in definition number order.
+        """
+        bits &= self.masks_by_text.get(text, 0)
+        def_nodes = []
+        while bits:
+            lowest = bits & -bits
+            def_nodes.append(self.def_nodes[lowest.bit_length() - 1])
+            bits ^= lowest
+        return def_nodes
+
 class DataFlowGraph:
-    def __init__(self, graph: nx.MultiDiGraph):
+    def __init__(self, graph: nx.MultiDiGraph, resolve_imports: bool=True, engine: DataFlowEngine=DataFlowEngine.WALK,
+                 definitions_cache: DefinitionsCache=None, definitions_keys: dict=None):
         self.graph = graph
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.definitions = Definitions()
+        # With a definitions cache, module definitions are loaded from it or generated on first lookup.
+        # Cache keys hash the module sources and are looked up by module node, modules without one are not cached.
+        self.definitions_cache = definitions_cache
+        self.definitions_keys = definitions_keys if definitions_keys is not None else {}
+        self.definitions = Definitions() if definitions_cache is None else ModuleDefinitions(self.load_children_definitions)
         self.df_edges = []
+        # Import edges cross modules, so they can not be resolved when the graph holds a single module.
+        # Unresolved import pairs are kept with the position in df_edges where their edges belong.
+        self.resolve_imports = resolve_imports
+        self.unresolved_imports = []
+        self.engine = engine
         
-    def generate_definitions(self):
+    def generate_definitions(self, modules=None):
+        """
+        Generate the definitions table of every module, or only of the given module nodes. With a definitions cache
+        the modules are only registered, their children are loaded when first looked up.
+        """
+        if modules is None:
+            modules = GraphVisitor().get_nodes_by_type(self.graph, node_type=TSNodeGroup.MODULE)
         
-        def generate_children_definitions(node):
-            children_definition = Definitions()
-                        
-            dummy, dummy_data = GraphVisitor().get_child_by_type(self.graph, node, TSNodeGroup.DUMMY, data=True)
-            if dummy_data["field_name"] not in [DummyNode.START, DummyNode.ENTRY]:
-                return children_definition
-            
-            for curr, _, _ in GraphVisitor().walk_nodes_by_edge_type(self.graph, source_node=dummy, edge_type=EdgeType.CF):
-                curr_data = GraphVisitor().get_node_by_id(self.graph, curr)
-                curr_type = curr_data.get("type")
-        
-                if curr_type in [TSNodeGroup.CLS_NODE, TSNodeGroup.FN_NODE]:
-                    n_name, n_name_data = GraphVisitor().get_child_by_field_name(self.graph, curr, "name",data=True)
-                    text = n_name_data.get("text")
-                    children_definition.add(text, curr)
-                    children_definition.add_children(text, generate_children_definitions(curr))
-                elif curr_type == TSNodeGroup.EXPR_STMT:
-                    for succ in GraphVisitor().immediate_successors(self.graph, curr):
-                        n_type = GraphVisitor().get_node_by_id(self.graph, succ)["type"]
-                        
-                        if n_type == TSNodeGroup.ASGMT:
-                            for lhs, _ in GraphTreeVisitor.assignment_pairs(self.graph, succ):
-                                lhs_data = GraphVisitor().get_node_by_id(self.graph, lhs)
-                                lhs_type = lhs_data.get("type")
-                                
-                                if lhs_type == TSNodeGroup.IDENTIFIER:
-                                    lhs_text = lhs_data.get("text")
-                                    if lhs_text:
-                                        children_definition.add(lhs_text, lhs)
-                                        children_definition.add_children(lhs_text, Definitions())
-                    
-            return children_definition
-        
-        for n in GraphVisitor().get_nodes_by_type(self.graph, node_type=TSNodeGroup.MODULE):
+        for n in modules:
             try:
                 n_data = GraphVisitor().get_node_by_id(self.graph, n)
                 
                 module_text = module_path_to_dotted_name(module_path = n_data.get("path"))
-                self.definitions.add(module_text, node_id=n)
-                self.definitions.add_children(module_text, generate_children_definitions(n))
+                if isinstance(self.definitions, ModuleDefinitions):
+                    self.definitions.add_pending(module_text, n)
+                else:
+                    self.definitions.add(module_text, node_id=n)
+                    self.definitions.add_children(module_text, self.generate_children_definitions(n))
                     
             except Exception as e:
                 self.logger.warning(f"Failed to get definitions for block {n} | {n_data}")
                 self.logger.warning(f"Warning Message: {e}")
+    
+    def generate_children_definitions(self, node) -> Definitions:
+        """
+        Definitions made in a module, class or function block: nested classes and functions with their own
+        children, and identifiers assigned to.
+        """
+        children_definition = Definitions()
+                    
+        dummy, dummy_data = GraphVisitor().get_child_by_type(self.graph, node, TSNodeGroup.DUMMY, data=True)
+        if dummy_data["field_name"] not in [DummyNode.START, DummyNode.ENTRY]:
+            return children_definition
         
-    def generate_data_flow_edges(self):
+        for curr, _, _ in GraphVisitor().walk_nodes_by_edge_type(self.graph, source_node=dummy, edge_type=EdgeType.CF):
+            curr_data = GraphVisitor().get_node_by_id(self.graph, curr)
+            curr_type = curr_data.get("type")
+    
+            if curr_type in [TSNodeGroup.CLS_NODE, TSNodeGroup.FN_NODE]:
+                n_name = GraphVisitor().get_child_by_field_name(self.graph, curr, "name")
+                text = GraphVisitor().get_node_text(self.graph, n_name)
+                children_definition.add(text, curr)
+                children_definition.add_children(text, self.generate_children_definitions(curr))
+            elif curr_type == TSNodeGroup.EXPR_STMT:
+                for succ in GraphVisitor().immediate_successors(self.graph, curr):
+                    n_type = GraphVisitor().get_node_by_id(self.graph, succ)["type"]
+                    
+                    if n_type == TSNodeGroup.ASGMT:
+                        for lhs, _ in GraphTreeVisitor.assignment_pairs(self.graph, succ):
+                            lhs_data = GraphVisitor().get_node_by_id(self.graph, lhs)
+                            lhs_type = lhs_data.get("type")
+                            
+                            if lhs_type == TSNodeGroup.IDENTIFIER:
+                                lhs_text = GraphVisitor().get_node_text(self.graph, lhs)
+                                if lhs_text:
+                                    children_definition.add(lhs_text, lhs)
+                                    children_definition.add_children(lhs_text, Definitions())
+                
+        return children_definition
+    
+    def load_children_definitions(self, module):
+        """
+        Children definitions of a module from the definitions cache, generated and cached on a miss.
+        Returns None when they can not be generated.
+        """
+        try:
+            cache_key = self.definitions_keys.get(module)
+            if cache_key is None:
+                return self.generate_children_definitions(module)
+            
+            children = self.definitions_cache.get(cache_key)
+            self.definitions_cache.record(children is not None)
+            if children is None:
+                children = self.generate_children_definitions(module)
+                self.definitions_cache.put(cache_key, children)
+            return children
+        except Exception as e:
+            self.logger.warning(f"Failed to get definitions for block {module}")
+            self.logger.warning(f"Warning Message: {e}")
+            return None
+        
+    def generate_data_flow_edges(self, blocks=None):
+        """
+        Generate DF edges for every START and ENTRY dummy node, or only for those among `blocks` when given.
+        """
         def log(dummy_node, edge_count):
             block_type = None
             block_name = None
@@ -105,14 +248,17 @@ class DataFlowGraph:
                 if block_type == TSNodeGroup.MODULE:
                     block_name = GraphVisitor().get_node_by_id(self.graph, pred).get("path")
                 else:
-                    block_name = GraphVisitor().get_node_by_id(self.graph, GraphVisitor().get_child_by_field_name(self.graph, pred, "name")).get("text")
+                    block_name = GraphVisitor().get_node_text(self.graph, GraphVisitor().get_child_by_field_name(self.graph, pred, "name"))
                     
                 break
             
             self.logger.info(f"DF generated for \033[92m{block_type}\033[0m: \033[94m{block_name}\033[0m. Edges added: {edge_count - curr_df_edge_count}")
 
+        if blocks is None:
+            blocks = GraphVisitor().get_nodes_by_type(self.graph, node_type=TSNodeGroup.DUMMY)
+        
         curr_df_edge_count = len(self.df_edges)
-        for n in GraphVisitor().get_nodes_by_type(self.graph, node_type=TSNodeGroup.DUMMY):
+        for n in blocks:
             try:
                 n_data = GraphVisitor().get_node_by_id(self.graph, n)
                 if n_data["field_name"] in [DummyNode.START, DummyNode.ENTRY]:
@@ -126,8 +272,11 @@ class DataFlowGraph:
         return self.df_edges
     
     def process_control_flow(self, node):
+        if self.engine == DataFlowEngine.REACHING_DEFINITIONS:
+            return self.solve_reaching_definitions(node)
+        
         liveness = FlowLiveness()
-        self.preload_constants(module_path=GraphVisitor().get_node_by_id(self.graph, node).get("module"), liveness=liveness)
+        self.preload_constants(module_path=GraphVisitor().get_node_module(self.graph, node), liveness=liveness)
         
         for curr, successors, delayed_nodes in GraphVisitor().walk_nodes_by_edge_type(self.graph, source_node=node, edge_type=EdgeType.CF):
             curr_data = GraphVisitor().get_node_by_id(self.graph, curr)
@@ -141,85 +290,27 @@ class DataFlowGraph:
             # import resolution
             if curr_data["type"] in TSNodeGroup.IMPORTS:
                 for import_pair in GraphTreeVisitor.get_import_pairs(self.graph, curr):
-                    module, symbol, alias = import_pair
-                    
-                    if module:
-                        module_data = GraphVisitor().get_node_by_id(self.graph, module)
-                    else:
-                        module_data = None
-                        
-                    if symbol:
-                        symbol_data = GraphVisitor().get_node_by_id(self.graph, symbol)
-                    else:
-                        symbol_data = None
-                    
-                    if alias:
-                        self.add_to_liveness(liveness, alias)
+                    self.add_import_to_liveness(liveness, import_pair)
+                    if self.resolve_imports:
+                        self.df_edges.extend(self.generate_import_edges(import_pair))
                     else:
-                        if symbol:
-                            symbol_text = symbol_data.get("text")
-                            module_text = module_data.get("text")
-                            
-                            if module_text and symbol_text == "*":
-                                module_def = self.definitions.get(module_text)
-                                if module_def:
-                                    for child_text, child_def in module_def.get("children", {}).table.items():
-                                        liveness.add(child_text, child_def["id"])
-                            else:
-                                self.add_to_liveness(liveness, symbol)
-                        else:
-                            if module:
-                                self.add_to_liveness(liveness, module)
-
-                    
-                    if module_data:
-                        module_text = module_data.get("text")
-                        if module_text:
-                            module_def = self.definitions.get(module_text)                            
-                            if module_def:
-                                module_def_id = module_def.get("id")
-                                self.df_edges.append((module_def_id, module, EdgeType.DF))
-                                
-                    
-                    if symbol_data:
-                        module_text = module_data.get("text")
-                        symbol_text = symbol_data.get("text")
-                        if symbol_text:
-                            module_def = self.definitions.get(module_text)
-                            if module_def:
-                                module_def_children = module_def.get("children")                                
-                                if module_def_children:
-                                    symbol_def = module_def_children.get(symbol_text)
-                                    if symbol_def:
-                                        symbol_def_id = symbol_def.get("id")
-                                        self.df_edges.append((symbol_def_id, symbol, EdgeType.DF))
+                        self.unresolved_imports.append((len(self.df_edges), import_pair))
             
             # expression statement (assignment, call, etc.)
             elif curr_data["type"] == TSNodeGroup.EXPR_STMT:
-                use_nodes, def_nodes = self.get_use_and_def_nodes(curr)
+                # The statement's own uses see the definitions before it, as in `x = x + 1`, while the conditions
+                # it flows into see its definitions
+                use_nodes, def_nodes = self.get_use_and_def_nodes(curr, edge_type=EdgeType.AST)
+                self.add_use_edges(liveness, use_nodes)
                 for def_node in def_nodes:
                     self.add_to_liveness(liveness, def_node)
-                        
-                for use_node in use_nodes:
-                    use_node_def = self.get_from_liveness(liveness, use_node)
-                    if use_node_def:
-                        if isinstance(use_node_def, list):
-                            for def_node in use_node_def:
-                                self.df_edges.append((def_node, use_node, EdgeType.DF))
-                        else:
-                            self.df_edges.append((use_node_def, use_node, EdgeType.DF))
+                condition_use_nodes, _ = self.get_use_and_def_nodes(curr, edge_type=EdgeType.CF)
+                self.add_use_edges(liveness, condition_use_nodes)
                         
             # return statement
             elif curr_data["type"] == TSNodeGroup.RETURN_STMT:
                 use_nodes, _ = self.get_use_and_def_nodes(curr)
-                for use_node in use_nodes:
-                    use_node_def = self.get_from_liveness(liveness, use_node)
-                    if use_node_def:
-                        if isinstance(use_node_def, list):
-                            for def_node in use_node_def:
-                                self.df_edges.append((def_node, use_node, EdgeType.DF))
-                        else:
-                            self.df_edges.append((use_node_def, use_node, EdgeType.DF))
+                self.add_use_edges(liveness, use_nodes)
                 
                 # to link all return statements to the dummy node         
                 for succ in GraphVisitor().immediate_successors(self.graph, curr):
@@ -238,6 +329,148 @@ class DataFlowGraph:
     
         return liveness
     
+    def solve_reaching_definitions(self, node):
+        """
+        Generate the DF edges of the CF region starting at a START or ENTRY dummy node from a gen/kill reaching
+        definitions analysis, iterated in reverse post-order until the definitions reaching each node stop changing.
+        
+        Unlike the walk of process_control_flow, every definition that can reach a use over some CF path is linked
+        to it, across loops and branches alike, and the uses of a statement see the definitions reaching the
+        statement rather than its own. Statements use only what is under them in the AST, conditions and loop
+        iterables being use sites of their own. Edges are emitted node by node in reverse post-order.
+        """
+        order = NXAlgorithms.postorder_by_edge_type(self.graph, node, edge_type=EdgeType.CF)
+        order.reverse()
+        positions = {n: i for i, n in enumerate(order)}
+        bitsets = DefinitionBitsets()
+        
+        # What each node defines and uses
+        facts = []  # position -> (node type, import pairs, use nodes, numbered definitions)
+        for curr in order:
+            curr_type = GraphVisitor().get_node_by_id(self.graph, curr)["type"]
+            definitions = FlowDefinitions()
+            import_pairs, use_nodes = [], []
+            
+            if curr == node:
+                self.preload_constants(module_path=GraphVisitor().get_node_module(self.graph, node), liveness=definitions)
+            elif curr_type in TSNodeGroup.IMPORTS:
+                import_pairs = list(GraphTreeVisitor.get_import_pairs(self.graph, curr))
+                for import_pair in import_pairs:
+                    self.add_import_to_liveness(definitions, import_pair)
+            elif curr_type == TSNodeGroup.EXPR_STMT:
+                use_nodes, def_nodes = self.get_use_and_def_nodes(curr, edge_type=EdgeType.AST)
+                for def_node in def_nodes:
+                    self.add_to_liveness(definitions, def_node)
+            elif curr_type == TSNodeGroup.RETURN_STMT:
+                use_nodes, _ = self.get_use_and_def_nodes(curr, edge_type=EdgeType.AST)
+            elif curr_type in TSNodeGroup.DEF_NODES:
+                self.add_to_liveness(definitions, GraphVisitor().get_child_by_field_name(self.graph, curr, "name"))
+            elif curr_type == TSNodeGroup.IDENTIFIER and GraphVisitor().get_node_by_id(self.graph, curr).get("field_name") not in ["right", "condition"]:
+                # loop variables and parameters
+                self.add_to_liveness(definitions, curr)
+            else:
+                # conditions of if and while statements and iterables of for loops
+                use_nodes = self.get_expression_use_nodes(curr, curr_type)
+            
+            numbered = [(text, bitsets.add(text, def_node)) for text, def_node in definitions.pairs]
+            facts.append((curr_type, import_pairs, use_nodes, numbered))
+        
+        gens, kills, predecessors = [], [], []
+        for curr, (_, _, _, numbered) in zip(order, facts):
+            gen, kill = bitsets.get_gen_and_kill(numbered)
+            gens.append(gen)
+            kills.append(kill)
+            predecessors.append([positions[pred] for pred in GraphVisitor.get_predecessors_by_edge_type(self.graph, curr, EdgeType.CF)
+                                 if pred in positions and curr != node])
+        
+        reaching = [0] * len(order)  # definitions reaching each node
+        leaving = list(gens)  # definitions leaving each node
+        changed = True
+        while changed:
+            changed = False
+            for i, preds in enumerate(predecessors):
+                bits = 0
+                for pred in preds:
+                    bits |= leaving[pred]
+                reaching[i] = bits
+                bits = gens[i] | (bits & ~kills[i])
+                if bits != leaving[i]:
+                    leaving[i] = bits
+                    changed = True
+        
+        for curr, bits, (curr_type, import_pairs, use_nodes, _) in zip(order, reaching, facts):
+            for import_pair in import_pairs:
+                if self.resolve_imports:
+                    self.df_edges.extend(self.generate_import_edges(import_pair))
+                else:
+                    self.unresolved_imports.append((len(self.df_edges), import_pair))
+            
+            for use_node in use_nodes:
+                use_node_text = GraphVisitor().get_node_text(self.graph, use_node)
+                if use_node_text:
+                    for def_node in bitsets.get_def_nodes(bits, use_node_text):
+                        self.df_edges.append((def_node, use_node, EdgeType.DF))
+            
+            if curr_type == TSNodeGroup.RETURN_STMT:
+                # to link all return statements to the dummy node
+                for succ in GraphVisitor().immediate_successors(self.graph, curr):
+                    succ_data = GraphVisitor().get_node_by_id(self.graph, succ)
+                    if succ_data["type"] == TSNodeGroup.DUMMY and succ_data["field_name"] == DummyNode.RETURN:
+                        self.df_edges.append((curr, succ, EdgeType.DF))
+    
+    def add_import_to_liveness(self, liveness: FlowLiveness, import_pair):
+        """
+        Make the names bound by one import pair live. Wildcard imports bring in every definition of the module.
+        """
+        module, symbol, alias = import_pair
+        
+        if alias:
+            self.add_to_liveness(liveness, alias)
+        else:
+            if symbol:
+                symbol_text = GraphVisitor().get_node_text(self.graph, symbol)
+                module_text = GraphVisitor().get_node_text(self.graph, module)
+                
+                if module_text and symbol_text == "*":
+                    module_def = self.definitions.get(module_text)
+                    if module_def:
+                        for child_text, child_def in module_def.get("children", {}).table.items():
+                            liveness.add(child_text, child_def["id"])
+                else:
+                    self.add_to_liveness(liveness, symbol)
+            else:
+                if module:
+                    self.add_to_liveness(liveness, module)
+    
+    def generate_import_edges(self, import_pair):
+        """
+        Generate DF edges from the imported module and symbol definitions to one import pair.
+        """
+        module, symbol, alias = import_pair
+        edges = []
+        
+        module_text = GraphVisitor().get_node_text(self.graph, module) if module else None
+        
+        if module_text:
+            module_def = self.definitions.get(module_text)
+            if module_def:
+                module_def_id = module_def.get("id")
+                edges.append((module_def_id, module, EdgeType.DF))
+        
+        if symbol:
+            symbol_text = GraphVisitor().get_node_text(self.graph, symbol)
+            if symbol_text:
+                module_def = self.definitions.get(module_text)
+                if module_def:
+                    module_def_children = module_def.get("children")
+                    if module_def_children:
+                        symbol_def = module_def_children.get(symbol_text)
+                        if symbol_def:
+                            symbol_def_id = symbol_def.get("id")
+                            edges.append((symbol_def_id, symbol, EdgeType.DF))
+        
+        return edges
+    
     def preload_constants(self, module_path: str, liveness: FlowLiveness):
         module_text = module_path_to_dotted_name(module_path)
         module_def = self.definitions.get(module_text)
@@ -247,10 +480,19 @@ class DataFlowGraph:
                 if child_text.isupper():
                     liveness.add(child_text, child_def["id"])
     
-    def get_use_and_def_nodes(self, node):
+    def get_use_and_def_nodes(self, node, edge_type=None):
+        """
+        Identifiers used and defined by a statement, looking at its successors over edges of one type when given,
+        otherwise at all its successors.
+        """
         use_nodes, def_nodes = [], []
         
-        for succ in GraphVisitor().immediate_successors(self.graph, node):
+        if edge_type is None:
+            successors = GraphVisitor().immediate_successors(self.graph, node)
+        else:
+            successors = GraphVisitor.get_successors_by_edge_type(self.graph, node, edge_type)
+        
+        for succ in successors:
             n_type = GraphVisitor().get_node_by_id(self.graph, succ)["type"]
             
             if n_type == TSNodeGroup.ASGMT:
@@ -258,30 +500,51 @@ class DataFlowGraph:
                     rhs_data = GraphVisitor().get_node_by_id(self.graph, rhs)
                     lhs_data = GraphVisitor().get_node_by_id(self.graph, lhs)
                     
-                    use_nodes.extend(GraphVisitor().find_nodes_by_type_from_source(self.graph, source_node=rhs, target_type=TSNodeGroup.IDENTIFIER))
+                    use_nodes.extend(GraphVisitor().find_descendants_by_type(self.graph, source_node=rhs, target_type=TSNodeGroup.IDENTIFIER))
                         
                     if lhs_data.get("type") == TSNodeGroup.IDENTIFIER:
                         def_nodes.append(lhs)
-            elif n_type in [TSNodeGroup.CALL] + TSNodeGroup.GENERIC_TYPES + TSNodeGroup.OPERATOR_TYPES:
-                use_nodes.extend(GraphVisitor().find_nodes_by_type_from_source(self.graph, source_node=succ, target_type=TSNodeGroup.IDENTIFIER))
-            elif n_type == TSNodeGroup.ATTRIBUTE:
-                obj, attribute_sequence = GraphTreeVisitor.get_object_attribute_sequence(self.graph, succ)
-                if obj:
-                    use_nodes.extend([obj])
-            elif n_type == TSNodeGroup.EXPR_LIST: # used in return statement
-                use_nodes.extend(GraphTreeVisitor.get_identifier_list(self.graph, succ))
-            elif n_type == TSNodeGroup.IDENTIFIER: # used in return statement
-                use_nodes.extend([succ])
+            else:
+                use_nodes.extend(self.get_expression_use_nodes(succ, n_type))
                         
         return use_nodes, def_nodes
     
+    def get_expression_use_nodes(self, node, n_type) -> list:
+        """
+        Identifiers used by an expression node.
+        """
+        if n_type in [TSNodeGroup.CALL] + TSNodeGroup.GENERIC_TYPES + TSNodeGroup.OPERATOR_TYPES:
+            return GraphVisitor().find_descendants_by_type(self.graph, source_node=node, target_type=TSNodeGroup.IDENTIFIER)
+        elif n_type == TSNodeGroup.ATTRIBUTE:
+            obj, attribute_sequence = GraphTreeVisitor.get_object_attribute_sequence(self.graph, node)
+            if obj:
+                return [obj]
+        elif n_type == TSNodeGroup.EXPR_LIST: # used in return statement
+            return GraphTreeVisitor.get_identifier_list(self.graph, node)
+        elif n_type == TSNodeGroup.IDENTIFIER: # used in return statement
+            return [node]
+        return []
+    
     def add_to_liveness(self, liveness: FlowLiveness, node):
-        node_text = GraphVisitor().get_node_by_id(self.graph, node).get("text")
+        node_text = GraphVisitor().get_node_text(self.graph, node)
         if node_text and node_text != "":
             liveness.add(node_text, node)
             
+    def add_use_edges(self, liveness: FlowLiveness, use_nodes: list):
+        """
+        Link each use to the definitions of its name in the liveness.
+        """
+        for use_node in use_nodes:
+            use_node_def = self.get_from_liveness(liveness, use_node)
+            if use_node_def:
+                if isinstance(use_node_def, list):
+                    for def_node in use_node_def:
+                        self.df_edges.append((def_node, use_node, EdgeType.DF))
+                else:
+                    self.df_edges.append((use_node_def, use_node, EdgeType.DF))
+            
     def get_from_liveness(self, liveness: FlowLiveness, node):
-        node_text = GraphVisitor().get_node_by_id(self.graph, node).get("text")
+        node_text = GraphVisitor().get_node_text(self.graph, node)
         if node_text and node_text != "":
             return liveness.get(node_text)
         
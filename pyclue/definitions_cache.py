@@ -0,0 +1,23 @@
+import hashlib
+
+from ast_cache import ASTCache
+
+class DefinitionsCache(ASTCache):
+    """
+    Persistent cache of per-module definitions tables (the children Definitions of a module), keyed by module
+    content like the AST cache and kept in the same directory under their own extension and size cap.
+    File IDs derive from the relative path, which is part of the key, so cached node IDs stay valid across runs.
+    """
+    NAME = "definitions cache"
+    ENTRY_EXTENSION = ".defs.pkl"
+    FORMAT_VERSION = 1
+
+    @staticmethod
+    def generate_key(rel_path: str, src_bytes: bytes) -> str:
+        """
+        Definitions are derived from the module's AST, so the key is its AST cache key salted with this format
+        version. The AST key covers the pyclue source, so a change to the CF, definitions or lookup code that
+        builds the tables invalidates them too.
+        """
+        ast_key = ASTCache.generate_key(rel_path, src_bytes)
+        return hashlib.sha256(f"definitions-{DefinitionsCache.FORMAT_VERSION}\0{ast_key}".encode("utf-8")).hexdigest()
@@ -0,0 +1,218 @@
+import os
+import time
+import logging
+from collections import defaultdict
+
+from abstract_syntax_tree import AbstractSyntaxTree
+from code_property_graph import CodePropertyGraph
+from control_flow_graph import ControlFlowGraph
+from csr_graph import CSRMultiDiGraph
+from data_flow_graph import DataFlowGraph
+from definitions_cache import DefinitionsCache
+from infer import TypeInference
+from visitor import GraphVisitor, GraphTreeVisitor
+from constants import AppConfig, TSNodeGroup, DummyNode, ParseMode
+from utils import module_path_to_dotted_name
+import utils
+
+class IncrementalCodePropertyGraph:
+    """
+    Keeps a generated CPG up to date as files change.
+
+    A changed file is re-parsed against its previous tree-sitter tree and its AST subgraph is swapped in the graph.
+    CF and DF edges are then regenerated for the module, class and function blocks of that file, and DF edges are
+    re-resolved for the import statements of other modules that refer to it.
+    """
+    def __init__(self, cpg: CodePropertyGraph, infer_types: bool=False):
+        if isinstance(cpg.graph, CSRMultiDiGraph):
+            raise TypeError("Incremental updates remove nodes from the graph, which needs the networkx backend.")
+        self.cpg = cpg
+        self.graph = cpg.graph
+        self.infer_types = infer_types
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.asts = {}  # file path -> AbstractSyntaxTree, kept so the next parse can reuse its tree
+        self.mtimes = self.scan_mtimes()
+        self.seed_asts()
+
+        self.dfg = DataFlowGraph(self.graph, engine=cpg.df_engine, definitions_cache=cpg.definitions_cache,
+                                 definitions_keys=cpg.definitions_keys)
+        if cpg.definitions is not None:
+            self.dfg.definitions = cpg.definitions
+        else:
+            self.dfg.generate_definitions()
+
+        self.importers = defaultdict(set)  # imported module text -> import statement nodes
+        self.file_imports = {}  # file path -> [(imported module text, import statement node)]
+        for file_path in cpg.file_node_counts:
+            self.index_imports(file_path, cpg.get_file_node_ids(file_path))
+
+    def scan_mtimes(self):
+        mtimes = {}
+        for file_path in utils.traverse_directory(self.cpg.dir,
+                                                  restrict_extensions=AppConfig.SUPPORTED_FILE_EXTENSIONS,
+                                                  ignore_dirs=AppConfig.IGNORE_DIRECTORIES):
+            try:
+                mtimes[file_path] = os.stat(file_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+        return mtimes
+
+    def seed_asts(self):
+        """
+        Parse the files already in the graph, so that even the first edit of a file re-parses against a previous tree.
+        """
+        for file_path, (file_id, _) in self.cpg.file_node_counts.items():
+            try:
+                self.asts[file_path] = AbstractSyntaxTree(repo_path=self.cpg.dir, file_path=file_path,
+                                                          parse_mode=ParseMode.BUFFER, file_id=file_id)
+            except Exception as e:
+                self.logger.warning(f"Error parsing file: {file_path}, its first update will parse it from scratch")
+                self.logger.warning(e)
+
+    def poll_changes(self):
+        """
+        Returns the (changed, deleted) file paths since the last poll. New files count as changed.
+        """
+        mtimes = self.scan_mtimes()
+        changed = [file_path for file_path, mtime in mtimes.items() if self.mtimes.get(file_path) != mtime]
+        deleted = [file_path for file_path in self.mtimes if file_path not in mtimes]
+        self.mtimes = mtimes
+        return changed, deleted
+
+    def watch(self, interval: float=1.0, on_update=None):
+        """
+        Poll the target directory and apply changes until interrupted.
+        `on_update(changed, deleted)` is called after each batch of changes is applied.
+        """
+        self.logger.info(f"Watching for changes in: \033[94m{self.cpg.dir}\033[0m")
+        while True:
+            changed, deleted = self.poll_changes()
+            for file_path in deleted:
+                self.remove_file(file_path)
+            for file_path in changed:
+                self.update_file(file_path)
+
+            if (changed or deleted) and on_update:
+                on_update(changed, deleted)
+            time.sleep(interval)
+
+    def update_file(self, file_path):
+        """
+        Re-generate the AST, CF and DF edges of a single changed (or new) file.
+        """
+        start = time.perf_counter()
+        try:
+            src_bytes = utils.get_file_bytes(".py", file_path)
+            ast = self.asts.get(file_path)
+            if ast is None:
+                rel_path = utils.get_relative_path(file_path, self.cpg.dir)
+                file_id = self.cpg.claim_file_id(file_path, utils.generate_file_id(rel_path))
+                ast = AbstractSyntaxTree(repo_path=self.cpg.dir, file_path=file_path, parse_mode=ParseMode.BUFFER,
+                                         file_id=file_id)
+            elif ast.src_bytes == src_bytes:
+                return
+            else:
+                ast.reparse(src_bytes)
+            self.asts[file_path] = ast
+
+            nodes, edges = ast.generate_nodes_and_edges(ast.tree.root_node)
+        except Exception as e:
+            self.logger.error(f"Error re-generating AST for file: {file_path}")
+            self.logger.error(e)
+            return
+
+        self.remove_file_nodes(file_path)
+        self.graph.add_nodes_from(nodes)
+        self.graph.add_edges_from(edges)
+        self.cpg.file_node_counts[file_path] = (ast.file_id, len(nodes))
+        node_ids = [n for n, _ in nodes]
+
+        cfg = ControlFlowGraph(self.graph)
+        self.graph.add_edges_from(cfg.generate_control_flow_edges(nodes=node_ids))
+
+        module = node_ids[0]
+        if self.cpg.definitions_cache:
+            self.cpg.definitions_keys[module] = DefinitionsCache.generate_key(ast.rel_path, src_bytes)
+        self.dfg.generate_definitions(modules=[module])
+        blocks = [n for n, n_data in nodes
+                  if n_data["type"] == TSNodeGroup.DUMMY and n_data["field_name"] in [DummyNode.START, DummyNode.ENTRY]]
+        self.add_data_flow_edges(blocks)
+        self.index_imports(file_path, node_ids)
+        self.resolve_importers(module_path_to_dotted_name(ast.rel_path), skip_file_id=ast.file_id)
+
+        if self.infer_types:
+            self.reinfer_types(blocks)
+
+        self.logger.info(f"CPG updated for file: \033[94m{file_path}\033[0m in {time.perf_counter() - start:.3f}s")
+
+    def remove_file(self, file_path):
+        """
+        Drop the subgraph of a deleted file along with its definitions.
+        """
+        if file_path not in self.cpg.file_node_counts:
+            return
+
+        module_text = module_path_to_dotted_name(utils.get_relative_path(file_path, self.cpg.dir))
+        self.cpg.release_file_id(file_path)
+        self.remove_file_nodes(file_path)
+        self.dfg.definitions.remove(module_text)
+        self.asts.pop(file_path, None)
+        self.logger.info(f"CPG updated for deleted file: \033[94m{file_path}\033[0m")
+
+    def remove_file_nodes(self, file_path):
+        """
+        Remove all AST nodes of a file. Their CF and DF edges, including cross-module ones, go with them.
+        """
+        for module_text, import_node in self.file_imports.pop(file_path, []):
+            self.importers[module_text].discard(import_node)
+
+        self.graph.remove_nodes_from(self.cpg.get_file_node_ids(file_path))
+        self.cpg.file_node_counts.pop(file_path, None)
+
+    def index_imports(self, file_path, node_ids):
+        file_imports = []
+        for n in node_ids:
+            if GraphVisitor.get_node_by_id(self.graph, n)["type"] not in TSNodeGroup.IMPORTS:
+                continue
+
+            for module, _, _ in GraphTreeVisitor.get_import_pairs(self.graph, n):
+                module_text = GraphVisitor.get_node_text(self.graph, module) if module else None
+                if module_text:
+                    self.importers[module_text].add(n)
+                    file_imports.append((module_text, n))
+
+        self.file_imports[file_path] = file_imports
+
+    def resolve_importers(self, module_text, skip_file_id=None):
+        """
+        Re-resolve the import statements of other modules that refer to an updated module.
+        Blocks with a wildcard import of it are re-processed, as the imported names feed their liveness.
+        """
+        wildcard_blocks = []
+        df_edges = []
+
+        for import_node in self.importers.get(module_text, ()):
+            if utils.unpack_node_id(import_node)[0] == skip_file_id:
+                continue
+
+            for import_pair in GraphTreeVisitor.get_import_pairs(self.graph, import_node):
+                _, symbol, _ = import_pair
+                if symbol and GraphVisitor.get_node_text(self.graph, symbol) == "*":
+                    wildcard_blocks.append(GraphTreeVisitor.get_enclosing_block(self.graph, import_node))
+                else:
+                    df_edges.extend(self.dfg.generate_import_edges(import_pair))
+
+        self.graph.add_edges_from(df_edges)
+        self.add_data_flow_edges([block for block in dict.fromkeys(wildcard_blocks) if block is not None])
+
+    def add_data_flow_edges(self, blocks):
+        self.dfg.df_edges = []
+        self.graph.add_edges_from(self.dfg.generate_data_flow_edges(blocks=blocks))
+
+    def reinfer_types(self, blocks):
+        inf = TypeInference(self.cpg)
+        for field_name in [DummyNode.START, DummyNode.ENTRY]:
+            for block in blocks:
+                if GraphVisitor.get_node_by_id(self.graph, block)["field_name"] == field_name:
+                    inf.process_control_flow(block)
@@ -0,0 +1,252 @@
+from bisect import bisect_right
+from collections import OrderedDict
+
+import networkx as nx
+
+from constants import AppConfig, EdgeType, TSNodeGroup
+
+class IndexedMultiDiGraph(nx.MultiDiGraph):
+    """
+    MultiDiGraph that keeps lookup indexes up to date as nodes and edges are added and removed.
+
+    - AST children of each node keyed by their field name and by their type, in edge insertion order.
+    - Nodes keyed by their type, and dummy nodes by their field name, in node insertion order.
+    - Successors and predecessors of each node per edge type (AST, CF, DF), in edge insertion order, so that
+      type-filtered neighbour queries do not go through the edges of the other types.
+    - AST children of each node kept sorted by source position (src_bytes_range start), so source ordered
+      traversals need no sort. Children with the same start stay in edge insertion order, like a stable sort.
+    - Descendants of a node of a given type over AST edges, memoized on first query and dropped whenever an
+      AST edge is added or removed.
+
+    Indexed attributes (type, field_name) are expected to be set before the node's AST edge is added and not
+    changed afterwards. Graph views (e.g. G.subgraph) share nodes with the viewed graph but not its indexes,
+    use IndexedMultiDiGraph.indexes_of to tell whether a graph's indexes can be used.
+    """
+    keeps_indexes = True
+    descendants_cache_size = AppConfig.AST_DESCENDANTS_CACHE_SIZE
+
+    def __init__(self, incoming_graph_data=None, multigraph_input=None, **attr):
+        self._ast_children_by_field_name = {}  # (parent, field name) -> [children]
+        self._ast_children_by_type = {}  # (parent, type) -> [children]
+        self._nodes_by_type = {}  # type -> {node: None}, dicts keep insertion order unlike sets
+        self._dummy_nodes_by_field_name = {}  # field name -> {node: None}
+        self._succ_by_edge_type = {}  # edge type -> {node: [successors]}
+        self._pred_by_edge_type = {}  # edge type -> {node: [predecessors]}
+        self._ast_descendants_by_type = OrderedDict()  # (node, type) -> [descendants], least recently used first
+        super().__init__(incoming_graph_data, multigraph_input=multigraph_input, **attr)
+
+    @staticmethod
+    def indexes_of(G: nx.MultiDiGraph):
+        """
+        Returns G if it keeps live indexes (IndexedMultiDiGraph or CSRMultiDiGraph), or None for plain graphs
+        and graph views.
+        """
+        # Checked by attribute rather than class, the package modules can be imported under two names
+        if getattr(G, "keeps_indexes", False) and "_graph" not in G.__dict__:
+            return G
+        return None
+
+    def get_ast_children_by_field_name(self, node, field_name) -> list:
+        return self._ast_children_by_field_name.get((node, field_name), [])
+
+    def get_ast_children_by_type(self, node, node_type) -> list:
+        return self._ast_children_by_type.get((node, node_type), [])
+
+    def get_nodes_by_type(self, node_type) -> list:
+        return list(self._nodes_by_type.get(node_type, ()))
+
+    def get_dummy_nodes_by_field_name(self, field_name) -> list:
+        return list(self._dummy_nodes_by_field_name.get(field_name, ()))
+
+    def get_successors_by_edge_type(self, node, edge_type) -> list:
+        """
+        Successors of a node over edges of one type. The returned list is owned by the graph, do not modify it.
+        """
+        return self._succ_by_edge_type.get(edge_type, {}).get(node, [])
+
+    def get_predecessors_by_edge_type(self, node, edge_type) -> list:
+        """
+        Predecessors of a node over edges of one type. The returned list is owned by the graph, do not modify it.
+        """
+        return self._pred_by_edge_type.get(edge_type, {}).get(node, [])
+
+    def get_ast_descendants_by_type(self, node, node_type) -> list:
+        """
+        The node and its AST descendants of one type, in breadth-first order. The returned list is owned by the
+        graph, do not modify it.
+        """
+        cache_key = (node, node_type)
+        descendants = self._ast_descendants_by_type.get(cache_key)
+        if descendants is not None:
+            self._ast_descendants_by_type.move_to_end(cache_key)
+        else:
+            ast_successors = self._succ_by_edge_type.get(EdgeType.AST, {})
+            descendants = []
+            queue = [node]
+            for current_node in queue:  # the queue grows while it is iterated
+                if self._node[current_node].get("type") == node_type:
+                    descendants.append(current_node)
+                queue.extend(ast_successors.get(current_node, ()))
+            self._ast_descendants_by_type[cache_key] = descendants
+            if len(self._ast_descendants_by_type) > self.descendants_cache_size:
+                self._ast_descendants_by_type.popitem(last=False)
+        return descendants
+
+    def _node_id(self, node_for_adding):
+        # Same rule as add_nodes_from: anything that is not a node yet and can not be hashed is a (node, dict) pair
+        try:
+            node_for_adding in self._node
+            return node_for_adding
+        except TypeError:
+            return node_for_adding[0]
+
+    def _node_index_keys(self, n):
+        # (type, dummy field name) the node is indexed under, the field name only counting for dummy nodes
+        n_data = self._node[n]
+        node_type = n_data.get("type")
+        return node_type, n_data.get("field_name") if node_type == TSNodeGroup.DUMMY else None
+
+    def _index_node(self, n):
+        node_type, field_name = self._node_index_keys(n)
+        self._nodes_by_type.setdefault(node_type, {})[n] = None
+        if node_type == TSNodeGroup.DUMMY:
+            self._dummy_nodes_by_field_name.setdefault(field_name, {})[n] = None
+
+    def _unindex_node(self, n, index_keys=None):
+        node_type, field_name = index_keys or self._node_index_keys(n)
+        for index, key in [(self._nodes_by_type, node_type), (self._dummy_nodes_by_field_name, field_name)]:
+            nodes = index.get(key)
+            if nodes is not None:
+                nodes.pop(n, None)
+                if not nodes:
+                    del index[key]
+
+    def _index_ast_edge(self, u, v):
+        v_data = self._node[v]
+        self._ast_children_by_field_name.setdefault((u, v_data.get("field_name")), []).append(v)
+        self._ast_children_by_type.setdefault((u, v_data.get("type")), []).append(v)
+
+    def _unindex_ast_edge(self, u, v):
+        v_data = self._node[v]
+        for index, key in [(self._ast_children_by_field_name, (u, v_data.get("field_name"))),
+                           (self._ast_children_by_type, (u, v_data.get("type")))]:
+            children = index.get(key)
+            if children is not None and v in children:
+                children.remove(v)
+                if not children:
+                    del index[key]
+
+    def _source_start(self, n):
+        src_bytes_range = self._node[n].get("src_bytes_range")
+        return src_bytes_range[0] if src_bytes_range is not None else None
+
+    def _index_edge(self, u, v, key):
+        successors = self._succ_by_edge_type.setdefault(key, {}).setdefault(u, [])
+        self._pred_by_edge_type.setdefault(key, {}).setdefault(v, []).append(u)
+        if key == EdgeType.AST:
+            self._index_ast_edge(u, v)
+            if self._ast_descendants_by_type:
+                self._ast_descendants_by_type.clear()
+            start = self._source_start(v)
+            # The AST builder adds children in source order, anything else is inserted at its place
+            if successors and start is not None:
+                last_start = self._source_start(successors[-1])
+                if last_start is not None and start < last_start:
+                    position = bisect_right(successors, start, key=lambda n: self._source_start(n) or 0)
+                    successors.insert(position, v)
+                    return
+        successors.append(v)
+
+    def _unindex_edge(self, u, v, key):
+        for layer, node, neighbour in [(self._succ_by_edge_type.get(key), u, v), (self._pred_by_edge_type.get(key), v, u)]:
+            neighbours = layer.get(node) if layer is not None else None
+            if neighbours is not None and neighbour in neighbours:
+                neighbours.remove(neighbour)
+                if not neighbours:
+                    del layer[node]
+        if key == EdgeType.AST:
+            self._unindex_ast_edge(u, v)
+            self._ast_descendants_by_type.clear()
+
+    def _unindex_node_edges(self, n):
+        for v, keydict in self._succ[n].items():
+            for key in keydict:
+                self._unindex_edge(n, v, key)
+        for u, keydict in self._pred[n].items():
+            if u != n:
+                for key in keydict:
+                    self._unindex_edge(u, n, key)
+
+    def _reindex_node(self, n, index_keys):
+        # Only a node whose indexed attributes changed moves, so the others keep their insertion order place
+        if index_keys != self._node_index_keys(n):
+            if index_keys is not None:
+                self._unindex_node(n, index_keys)
+            self._index_node(n)
+
+    def add_node(self, node_for_adding, **attr):
+        index_keys = self._node_index_keys(node_for_adding) if node_for_adding in self._node else None
+        super().add_node(node_for_adding, **attr)
+        self._reindex_node(node_for_adding, index_keys)
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        nodes_for_adding = list(nodes_for_adding)
+        node_ids = [self._node_id(node_for_adding) for node_for_adding in nodes_for_adding]
+        index_keys = {n: self._node_index_keys(n) for n in node_ids if n in self._node}
+        super().add_nodes_from(nodes_for_adding, **attr)
+        for n in node_ids:
+            self._reindex_node(n, index_keys.get(n))
+
+    def add_edge(self, u_for_edge, v_for_edge, key=None, **attr):
+        for n in (u_for_edge, v_for_edge):
+            if n not in self._node and n is not None:
+                # Nodes added by an edge have no attributes yet
+                self._nodes_by_type.setdefault(None, {})[n] = None
+        keydict = self._succ.get(u_for_edge, {}).get(v_for_edge, {})
+        is_new_edge = key is None or key not in keydict
+        key = super().add_edge(u_for_edge, v_for_edge, key, **attr)
+        if is_new_edge:
+            self._index_edge(u_for_edge, v_for_edge, key)
+        return key
+
+    def remove_edge(self, u, v, key=None):
+        if key is None:
+            # networkx removes the most recently added edge between u and v
+            key = next(reversed(self._succ.get(u, {}).get(v, {None: None})))
+        if key in self._succ.get(u, {}).get(v, {}):
+            self._unindex_edge(u, v, key)
+        super().remove_edge(u, v, key)
+
+    def remove_node(self, n):
+        if n in self._succ:
+            self._unindex_node_edges(n)
+            self._unindex_node(n)
+        super().remove_node(n)
+
+    def remove_nodes_from(self, nodes):
+        nodes = list(nodes)
+        for n in nodes:
+            if n in self._succ:
+                self._unindex_node_edges(n)
+        for n in nodes:
+            if n in self._succ:
+                self._unindex_node(n)
+        super().remove_nodes_from(nodes)
+
+    def clear(self):
+        super().clear()
+        self._ast_children_by_field_name.clear()
+        self._ast_children_by_type.clear()
+        self._nodes_by_type.clear()
+        self._dummy_nodes_by_field_name.clear()
+        self._succ_by_edge_type.clear()
+        self._pred_by_edge_type.clear()
+        self._ast_descendants_by_type.clear()
+
+    def clear_edges(self):
+        super().clear_edges()
+        self._ast_children_by_field_name.clear()
+        self._ast_children_by_type.clear()
+        self._succ_by_edge_type.clear()
+        self._pred_by_edge_type.clear()
+        self._ast_descendants_by_type.clear()
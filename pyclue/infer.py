@@ -11,16 +11,12 @@ class TypeInference:
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def infer_types(self):
-        for n in GraphVisitor.get_nodes_by_type(self.cpg.graph, node_type=TSNodeGroup.DUMMY):
-            n_data = GraphVisitor.get_node_by_id(self.cpg.graph, n)
-            if n_data.get("field_name") == DummyNode.START:
-                self.process_control_flow(n)
+        for n in GraphVisitor.get_dummy_nodes(self.cpg.graph, DummyNode.START):
+            self.process_control_flow(n)
                 
         # FIXME: temp fix to rerun type inference for function blocks to overwrite inferred types based on calls
-        for n in GraphVisitor.get_nodes_by_type(self.cpg.graph, node_type=TSNodeGroup.DUMMY):
-            n_data = GraphVisitor.get_node_by_id(self.cpg.graph, n)
-            if n_data.get("field_name") == DummyNode.ENTRY:
-                self.process_control_flow(n)
+        for n in GraphVisitor.get_dummy_nodes(self.cpg.graph, DummyNode.ENTRY):
+            self.process_control_flow(n)
                 
     def process_control_flow(self, node, preload_pairs=None):
         try:
@@ -33,8 +29,8 @@ class TypeInference:
                 if unnamed_preload_pair_count > 0:
                     named_preload_pairs = preload_pairs[unnamed_preload_pair_count:]
                     for pair in named_preload_pairs:
-                        key_text = GraphVisitor.get_node_by_id(self.cpg.graph, pair[0]).get('text')
-                        value_text = GraphVisitor.get_node_by_id(self.cpg.graph, pair[1]).get('text')
+                        key_text = GraphVisitor.get_node_text(self.cpg.graph, pair[0])
+                        value_text = GraphVisitor.get_node_text(self.cpg.graph, pair[1])
                         name_preload_table[key_text] = value_text
                 
             for curr, successors, _ in GraphVisitor.walk_nodes_by_edge_type(self.cpg.graph, source_node=node, edge_type=EdgeType.CF):
@@ -50,8 +46,9 @@ class TypeInference:
                                 key, val = preload_pairs[preload_pair_idx]
                                 preload_pair_idx += 1
                             else:
-                                if curr_data.get("text") in name_preload_table:
-                                    val = name_preload_table[curr_data.get("text")]
+                                curr_text = GraphVisitor.get_node_text(self.cpg.graph, curr)
+                                if curr_text in name_preload_table:
+                                    val = name_preload_table[curr_text]
                         elif curr_data.get("type") == TSNodeGroup.FN_DEFAULT_PARAM:
                             # TODO: handle default parameter type pairing
                             pass
@@ -100,7 +97,7 @@ class TypeInference:
             if block_type == TSNodeGroup.MODULE:
                 block_name = GraphVisitor.get_node_by_id(self.cpg.graph, pred).get("path")
             else:
-                block_name = GraphVisitor.get_node_by_id(self.cpg.graph, GraphVisitor.get_child_by_field_name(self.cpg.graph, pred, "name")).get("text")
+                block_name = GraphVisitor.get_node_text(self.cpg.graph, GraphVisitor.get_child_by_field_name(self.cpg.graph, pred, "name"))
                 
             break
         
@@ -156,11 +153,10 @@ class TypeInference:
     
     def _infer_type(self, node):
         #FIXME: stack the types while resolving this block rather than storing to graph directly
-        stmt_graph = GraphVisitor.generate_subgraph(self.cpg.graph, node, EdgeType.AST)
-        resolve_order = NXAlgorithms.topological_sort(stmt_graph)
+        resolve_order = NXAlgorithms.postorder_by_edge_type(self.cpg.graph, node, EdgeType.AST)
         
         for each in resolve_order:
-            each_type = GraphVisitor.get_node_by_id(stmt_graph, each).get('type')
+            each_type = GraphVisitor.get_node_by_id(self.cpg.graph, each).get('type')
 
             calculated_type = None
             if each_type in TSNodeGroup.OPERATOR_TYPES:
@@ -176,7 +172,7 @@ class TypeInference:
         return GraphVisitor.get_node_by_id(self.cpg.graph, node).get('inferred_type')
     
     def _infer_annotation_type(self, annotation_target_node, annotation_node):
-        annotated_type_text = GraphVisitor.get_node_by_id(self.cpg.graph, annotation_node).get('text')
+        annotated_type_text = GraphVisitor.get_node_text(self.cpg.graph, annotation_node)
         
         GraphVisitor.update_node(self.cpg.graph, annotation_target_node, {'inferred_type': annotated_type_text})
         # check if lhs has outdegree of DF
@@ -206,7 +202,7 @@ class TypeInference:
                         self.process_control_flow(fn_entry, preload_pairs=params_pairs)
                     elif call_def_type == TSNodeGroup.CLS_NODE:
                         # Class / user defined type
-                        resolved_type = GraphVisitor.get_node_by_id(self.cpg.graph, call_def_name).get('text')
+                        resolved_type = GraphVisitor.get_node_text(self.cpg.graph, call_def_name)
                     
         if fn_return:
             resolved_type = GraphVisitor.get_node_by_id(self.cpg.graph, fn_return).get('inferred_type')
@@ -0,0 +1,231 @@
+from array import array
+from collections.abc import MutableMapping
+
+from source_store import SourceStore
+from indexed_graph import IndexedMultiDiGraph
+
+class NodeRecordStore:
+    """
+    Columnar storage of node attributes: interned string codes, span pairs and integers held in arrays.
+
+    Every node record has a layout, the ordered keys it holds and how each value is stored, shared by all records
+    with the same keys. Values that do not fit their column (e.g. a list where a span tuple is expected) or keys
+    without a column are kept in a per-record dict instead, so any attribute can still be stored.
+    Removing a node leaves its slot in the columns unused.
+    """
+    STRING, PAIR, INT, EXTRA = range(4)
+    STRING_KEYS = ["type", "field_name", "text", "module", "path", "inferred_type"]
+    PAIR_KEYS = ["src_bytes_range", "start_point", "end_point"]
+    INT_KEYS = [SourceStore.FILE_INDEX]
+    PAIR_MAX = (1 << 32) - 1
+
+    def __init__(self):
+        self.strings = [None]  # code 0 is None
+        self._string_codes = {None: 0}
+        self.columns = {}
+        for key in self.STRING_KEYS:
+            self.columns[key] = array("I")
+        for key in self.PAIR_KEYS:
+            self.columns[key] = array("I")  # two values per record
+        for key in self.INT_KEYS:
+            self.columns[key] = array("q")
+        self.column_kinds = {key: self.STRING for key in self.STRING_KEYS}
+        self.column_kinds.update({key: self.PAIR for key in self.PAIR_KEYS})
+        self.column_kinds.update({key: self.INT for key in self.INT_KEYS})
+
+        self.layouts = [{}]  # layout code -> {key: kind} in key order
+        self._layout_codes = {(): 0}
+        self._transitions = {}  # (layout code, key, kind or None to remove) -> layout code
+        self.record_layouts = array("H")
+        self.extras = {}  # record index -> {key: value} of values kept outside the columns
+
+    def __len__(self):
+        return len(self.record_layouts)
+
+    def new_record(self):
+        """
+        Allocate an empty record. Used as the node attribute dict factory of CompactMultiDiGraph.
+        """
+        index = len(self.record_layouts)
+        self.record_layouts.append(0)
+        for key, kind in self.column_kinds.items():
+            column = self.columns[key]
+            if kind == self.PAIR:
+                column.extend((0, 0))
+            else:
+                column.append(0)
+        return NodeRecord(self, index)
+
+    def intern(self, string) -> int:
+        code = self._string_codes.get(string)
+        if code is None:
+            code = self._string_codes[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+
+    def get_layout_code(self, layout: dict) -> int:
+        layout_key = tuple(layout.items())
+        code = self._layout_codes.get(layout_key)
+        if code is None:
+            code = self._layout_codes[layout_key] = len(self.layouts)
+            self.layouts.append(layout)
+        return code
+
+    def transition(self, layout_code: int, key, kind) -> int:
+        """
+        Code of the layout with `key` stored as `kind`, keeping its position if present, or removed when kind is None.
+        """
+        transition = (layout_code, key, kind)
+        code = self._transitions.get(transition)
+        if code is None:
+            layout = dict(self.layouts[layout_code])
+            if kind is None:
+                del layout[key]
+            else:
+                layout[key] = kind
+            code = self._transitions[transition] = self.get_layout_code(layout)
+        return code
+
+    def kind_for(self, key, value):
+        """
+        Kind of column that can hold the value of a key, or EXTRA when none can.
+        """
+        kind = self.column_kinds.get(key)
+        if kind == self.STRING:
+            if value is None or type(value) is str:
+                return kind
+        elif kind == self.PAIR:
+            if (type(value) is tuple and len(value) == 2 and type(value[0]) is int and type(value[1]) is int
+                    and 0 <= value[0] <= self.PAIR_MAX and 0 <= value[1] <= self.PAIR_MAX):
+                return kind
+        elif kind == self.INT:
+            if type(value) is int and -(1 << 63) <= value < (1 << 63):
+                return kind
+        return self.EXTRA
+
+    def get(self, index: int, key, kind):
+        if kind == self.STRING:
+            return self.strings[self.columns[key][index]]
+        elif kind == self.PAIR:
+            column = self.columns[key]
+            return column[2 * index], column[2 * index + 1]
+        elif kind == self.INT:
+            return self.columns[key][index]
+        return self.extras[index][key]
+
+    def set(self, index: int, key, value):
+        layout_code = self.record_layouts[index]
+        previous_kind = self.layouts[layout_code].get(key)
+        kind = self.kind_for(key, value)
+
+        if kind == self.STRING:
+            self.columns[key][index] = self.intern(value)
+        elif kind == self.PAIR:
+            self.columns[key][2 * index] = value[0]
+            self.columns[key][2 * index + 1] = value[1]
+        elif kind == self.INT:
+            self.columns[key][index] = value
+        else:
+            self.extras.setdefault(index, {})[key] = value
+
+        if previous_kind != kind:
+            if previous_kind == self.EXTRA:
+                self.remove_extra(index, key)
+            self.record_layouts[index] = self.transition(layout_code, key, kind)
+
+    def set_many(self, index: int, attributes: dict):
+        """
+        Set the attributes of a record that holds no keys yet, finding its layout once rather than per key.
+        """
+        layout = {}
+        for key, value in attributes.items():
+            kind = self.kind_for(key, value)
+            layout[key] = kind
+            if kind == self.STRING:
+                self.columns[key][index] = self.intern(value)
+            elif kind == self.PAIR:
+                self.columns[key][2 * index] = value[0]
+                self.columns[key][2 * index + 1] = value[1]
+            elif kind == self.INT:
+                self.columns[key][index] = value
+            else:
+                self.extras.setdefault(index, {})[key] = value
+        self.record_layouts[index] = self.get_layout_code(layout)
+
+    def delete(self, index: int, key):
+        layout_code = self.record_layouts[index]
+        kind = self.layouts[layout_code].get(key)
+        if kind is None:
+            raise KeyError(key)
+        if kind == self.EXTRA:
+            self.remove_extra(index, key)
+        self.record_layouts[index] = self.transition(layout_code, key, None)
+
+    def remove_extra(self, index: int, key):
+        extras = self.extras[index]
+        del extras[key]
+        if not extras:
+            del self.extras[index]
+
+class NodeRecord(MutableMapping):
+    """
+    Dict-like view of one node's attributes in a NodeRecordStore, keys iterate in insertion order like a dict.
+    """
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: NodeRecordStore, index: int):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, key):
+        store = self.store
+        kind = store.layouts[store.record_layouts[self.index]].get(key)
+        if kind is None:
+            raise KeyError(key)
+        return store.get(self.index, key, kind)
+
+    def get(self, key, default=None):
+        store = self.store
+        kind = store.layouts[store.record_layouts[self.index]].get(key)
+        if kind is None:
+            return default
+        return store.get(self.index, key, kind)
+
+    def __contains__(self, key):
+        store = self.store
+        return key in store.layouts[store.record_layouts[self.index]]
+
+    def __setitem__(self, key, value):
+        self.store.set(self.index, key, value)
+
+    def __delitem__(self, key):
+        self.store.delete(self.index, key)
+
+    def __iter__(self):
+        store = self.store
+        return iter(list(store.layouts[store.record_layouts[self.index]]))
+
+    def __len__(self):
+        store = self.store
+        return len(store.layouts[store.record_layouts[self.index]])
+
+    def update(self, other=(), **kwargs):
+        if not kwargs and isinstance(other, dict) and self.store.record_layouts[self.index] == 0:
+            self.store.set_many(self.index, other)
+        else:
+            super().update(other, **kwargs)
+
+    def copy(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+class CompactMultiDiGraph(IndexedMultiDiGraph):
+    """
+    IndexedMultiDiGraph whose node attributes are NodeRecord views into one NodeRecordStore instead of a dict per node.
+    """
+    def __init__(self, incoming_graph_data=None, multigraph_input=None, **attr):
+        self.records = NodeRecordStore()
+        self.node_attr_dict_factory = self.records.new_record
+        super().__init__(incoming_graph_data, multigraph_input=multigraph_input, **attr)
@@ -1,12 +1,23 @@
+from collections import deque
+from itertools import pairwise
+
 class Node:
-    def __init__(self, id: str):
-        if not isinstance(id, str):
-            raise TypeError("id must be a string")
-        self.id: str = id
+    __slots__ = ("id",)
+    
+    def __init__(self, id: int):
+        if not isinstance(id, (int, str)):
+            raise TypeError("id must be an integer node ID or a string")
+        self.id: int = id
 
 class Sequence:
+    """
+    Items of a block in execution order: nodes and nested sequences. Sequences are built once per block and
+    hold one item per statement, so they are slotted and kept in a deque for constant time insertion at the head.
+    """
+    __slots__ = ("items", "edges")
+    
     def __init__(self):
-        self.items = []
+        self.items = deque()
         self.edges = []
         
     def has_items(self):
@@ -16,7 +27,7 @@ class Sequence:
         self.items.append(item)
                     
     def add_at_start(self, item):
-        self.items.insert(0, item)
+        self.items.appendleft(item)
         
     def add_at_end(self, item):
         self.items.append(item)
@@ -35,27 +46,37 @@ class Sequence:
         self.items.extend(other_sequence_items)
     
     def generate_edges(self, edge_type):
-        if len(self.items) == 0:
+        self._generate_chain_edges(self.items, edge_type, self.edges)
+    
+    @staticmethod
+    def _generate_chain_edges(items, edge_type, edges: list):
+        """
+        Append to `edges` the edges linking each item's tails to the next item's head, and the inner edges of the
+        nested sequences after the first item (or of the only item).
+        """
+        if len(items) == 1:
+            Sequence._generate_complex_item_edges(items[0], edge_type, edges)
             return
-        elif len(self.items) == 1:
-            self.generate_edges_for_complex_sequence(self.items[0], edge_type)
-        elif len(self.items) > 1:
-            for i in range(len(self.items) - 1):
-                tails = self._get_item_tail(self.items[i])
-                head = self._get_item_head(self.items[i + 1])
-                self.generate_edges_for_complex_sequence(self.items[i + 1], edge_type)
-                
-                if head and tails:
-                    if len(tails) > 0:
-                        for tail in tails:
-                            self.edges.append((tail.id, head.id, edge_type))
-                    
+        
+        for item, next_item in pairwise(items):
+            tails = Sequence._get_item_tail(item)
+            head = Sequence._get_item_head(next_item)
+            Sequence._generate_complex_item_edges(next_item, edge_type, edges)
+            
+            if head and tails:
+                for tail in tails:
+                    edges.append((tail.id, head.id, edge_type))
                     
     def generate_edges_for_complex_sequence(self, item, edge_type):
-         if isinstance(item, LoopSequence) or isinstance(item, ConditionalSequence) or isinstance(item, ExceptionSequence):
-            self.edges.extend(item.generate_edges(edge_type))
+        self._generate_complex_item_edges(item, edge_type, self.edges)
+    
+    @staticmethod
+    def _generate_complex_item_edges(item, edge_type, edges: list):
+        if isinstance(item, (LoopSequence, ConditionalSequence, ExceptionSequence)):
+            edges.extend(item.generate_edges(edge_type))
             
-    def _get_item_head(self, item):
+    @staticmethod
+    def _get_item_head(item):
         head = None
         if type(item) is Node:
             head = item
@@ -64,14 +85,14 @@ class Sequence:
         elif type(item) is LoopSequence:
             head = item.main_s.get_head()
         elif type(item) is ConditionalSequence:
-            if item.sequences:
-                head = Node(list(item.sequences.keys())[0])
+            head = item.get_head()
         elif type(item) is ExceptionSequence:
             head = item.try_s.get_head()
         
         return head
     
-    def _get_item_tail(self, item):
+    @staticmethod
+    def _get_item_tail(item):
         tails = []
         
         if type(item) is Node:
@@ -97,33 +118,44 @@ class ConditionalSequence(Sequence):
     """
     Manage multiple sequences in a graph, like a jagged sequence
     """
+    __slots__ = ("sequences", "head_node")
+    
     def __init__(self):
         self.sequences: dict[str, Sequence] = {}
+        self.head_node = None  # node of the first condition, made on first use
         super().__init__()
         
     def add_sequence(self, key, sequence: Sequence):
         self.sequences[key] = sequence
     
+    def get_head(self):
+        if self.head_node is None and self.sequences:
+            self.head_node = Node(next(iter(self.sequences)))
+        return self.head_node
+    
     def generate_edges(self, edge_type):
         edges = []
-        main_s = Sequence()
+        conditions = []
         
         for key, sequence in self.sequences.items():
+            head = sequence.get_head()
             if key == "else":
-                main_s.add_item(sequence.get_head())
+                conditions.append(head)
             else:
-                main_s.add_item(Node(key))
-                if sequence.get_head():
-                    edges.append((key, sequence.get_head().id, edge_type))
+                conditions.append(Node(key))
+                if head:
+                    edges.append((key, head.id, edge_type))
             
             sequence.generate_edges(edge_type)
             edges.extend(sequence.edges)
             
-        main_s.generate_edges(edge_type)
-        edges.extend(main_s.edges)
+        # Chain the conditions into each other, each falls through to the next one
+        self._generate_chain_edges(conditions, edge_type, edges)
         return edges
     
 class LoopSequence(Sequence):
+    __slots__ = ("main_s", "block_s", "left_id")
+    
     def __init__(self):
         self.main_s = Sequence()
         self.block_s = Sequence()
@@ -137,15 +169,19 @@ class LoopSequence(Sequence):
         edges.extend(self.block_s.edges)
         
         if self.left_id:
-            if self.block_s.get_head():
-                edges.append((self.left_id, self.block_s.get_head().id, edge_type))
-            if self.block_s.get_tail():
-                for tail_node in self.block_s.get_tail():
+            block_head = self.block_s.get_head()
+            if block_head:
+                edges.append((self.left_id, block_head.id, edge_type))
+            block_tails = self.block_s.get_tail()
+            if block_tails:
+                for tail_node in block_tails:
                     edges.append((tail_node.id, self.left_id, edge_type))
                     
         return edges
         
 class ExceptionSequence(Sequence):
+    __slots__ = ("try_s", "except_ss", "finally_s")
+    
     def __init__(self):
         self.try_s = Sequence()
         self.except_ss: dict[str, Sequence] = {}
@@ -164,7 +200,8 @@ class ExceptionSequence(Sequence):
         except_head, except_edges = self._generate_except_sequences_edges(edge_type)
         edges.extend(except_edges)
         
-        for tail in self.try_s.get_tail():
+        try_tails = self.try_s.get_tail()
+        for tail in try_tails:
             if except_head:
                 edges.append((tail.id, except_head.id, edge_type))
         
@@ -172,35 +209,35 @@ class ExceptionSequence(Sequence):
             self.finally_s.generate_edges(edge_type)
             edges.extend(self.finally_s.edges)
             
-            for tail in self.try_s.get_tail():
-                if self.finally_s.get_head():
-                    edges.append((tail.id, self.finally_s.get_head().id, edge_type))
+            finally_head = self.finally_s.get_head()
+            for tail in try_tails:
+                if finally_head:
+                    edges.append((tail.id, finally_head.id, edge_type))
                     
             for key, sequence in self.except_ss.items():
                 for tail in sequence.get_tail():
-                    edges.append((tail.id, self.finally_s.get_head().id, edge_type))
+                    edges.append((tail.id, finally_head.id, edge_type))
                     
         return edges
     
     def _generate_except_sequences_edges(self, edge_type):
         edges = []
-        head = None
-        main_s = Sequence()
+        handlers = []
         
         for key, sequence in self.except_ss.items():
+            head = sequence.get_head()
             if key == "except":
-                main_s.add_item(sequence.get_head())
+                handlers.append(head)
             else:
-                main_s.add_item(Node(key))
-                if sequence.get_head():
-                    edges.append((key, sequence.get_head().id, edge_type))
+                handlers.append(Node(key))
+                if head:
+                    edges.append((key, head.id, edge_type))
             
             sequence.generate_edges(edge_type)
             edges.extend(sequence.edges)
             
-        main_s.generate_edges(edge_type)
-        edges.extend(main_s.edges)
+        self._generate_chain_edges(handlers, edge_type, edges)
         
-        head = main_s.get_head()
+        head = self._get_item_head(handlers[0]) if handlers else None
         
         return head, edges
\ No newline at end of file
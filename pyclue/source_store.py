@@ -0,0 +1,118 @@
+import sys
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from constants import AppConfig, TSNodeGroup
+import utils
+
+class SourceStore:
+    """
+    Source buffers of the files in a graph, for nodes generated in lazy text mode.
+
+    Lazy node records keep their byte span and the index of their file in this store instead of their text,
+    module and points, which are read back from the file when asked for. Files are memory-mapped on first use
+    and only a bounded number of them are kept open. Texts are interned, so a hot identifier is decoded once
+    and shared by every node that spells it.
+
+    Files are expected not to change between generating the AST and reading text back.
+    """
+    GRAPH_KEY = "sources"  # key of the store in the graph attributes
+    FILE_INDEX = "file_index"  # key of the file index in lazy node records
+
+    def __init__(self, max_open_files: int=AppConfig.LAZY_TEXT_OPEN_FILES, text_cache_size: int=AppConfig.LAZY_TEXT_CACHE_SIZE):
+        self.file_paths = []
+        self.modules = []
+        self.max_open_files = max_open_files
+        self.text_cache_size = text_cache_size
+        self._buffers = OrderedDict()  # file index -> open buffer, least recently used first
+        self._line_starts = {}  # file index -> byte offsets where each line starts
+        self._texts = {}  # source bytes -> interned text
+
+    def add(self, file_path, module: str) -> int:
+        """
+        Register a file and return its index.
+        """
+        self.file_paths.append(file_path)
+        self.modules.append(module)
+        return len(self.file_paths) - 1
+
+    def get_module(self, file_index: int) -> str:
+        return self.modules[file_index]
+
+    def get_buffer(self, file_index: int):
+        buffer = self._buffers.get(file_index)
+        if buffer is not None:
+            self._buffers.move_to_end(file_index)
+            return buffer
+
+        buffer = utils.get_file_mmap(self.file_paths[file_index])
+        self._buffers[file_index] = buffer
+        if len(self._buffers) > self.max_open_files:
+            _, evicted = self._buffers.popitem(last=False)
+            if hasattr(evicted, "close"):
+                evicted.close()
+        return buffer
+
+    def get_text(self, file_index: int, start_byte: int, end_byte: int) -> str:
+        src = self.get_buffer(file_index)[start_byte:end_byte]
+        text = self._texts.get(src)
+        if text is None:
+            if len(self._texts) >= self.text_cache_size:
+                self._texts.clear()
+            text = self._texts[src] = sys.intern(src.decode("utf8"))
+        return text
+
+    def get_point(self, file_index: int, byte_offset: int) -> tuple[int, int]:
+        """
+        Tree-sitter (row, column) point of a byte offset, where the column is counted in bytes.
+        """
+        line_starts = self._line_starts.get(file_index)
+        if line_starts is None:
+            src = self.get_buffer(file_index)
+            line_starts = array("I", [0])
+            offset = src.find(b"\n")
+            while offset != -1:
+                line_starts.append(offset + 1)
+                offset = src.find(b"\n", offset + 1)
+            self._line_starts[file_index] = line_starts
+
+        row = bisect_right(line_starts, byte_offset) - 1
+        return row, byte_offset - line_starts[row]
+
+    def get_node_text(self, n_data: dict):
+        """
+        Text of a lazy node record, the same as AbstractSyntaxTree.get_node_properties would have stored.
+        """
+        node_type = n_data["type"]
+        if node_type in TSNodeGroup.NODES_WITH_TEXT:
+            return self.get_text(n_data[self.FILE_INDEX], *n_data["src_bytes_range"])
+        elif node_type in TSNodeGroup.NODES_WITH_TEXT_MASKED:
+            return f"{{{node_type}}}"
+        return None
+
+    def materialize(self, n_data: dict) -> dict:
+        """
+        Full node record of a lazy one, with the keys in the order AbstractSyntaxTree.get_node_properties uses.
+        """
+        file_index = n_data[self.FILE_INDEX]
+        start_byte, end_byte = n_data["src_bytes_range"]
+        props = {
+            "type": n_data["type"],
+            "field_name": n_data["field_name"],
+            "text": self.get_node_text(n_data),
+            "src_bytes_range": n_data["src_bytes_range"],
+            "start_point": self.get_point(file_index, start_byte),
+            "end_point": self.get_point(file_index, end_byte),
+            "module": self.get_module(file_index),
+        }
+        for key, value in n_data.items():
+            if key not in props and key != self.FILE_INDEX:
+                props[key] = value
+        return props
+
+    def close(self):
+        for buffer in self._buffers.values():
+            if hasattr(buffer, "close"):
+                buffer.close()
+        self._buffers.clear()
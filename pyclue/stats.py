@@ -0,0 +1,127 @@
+import json
+import sys
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+import numpy as np
+
+from indexed_graph import IndexedMultiDiGraph
+
+class GraphSize:
+    """
+    Size of a CPG: node count, edge counts per edge type and approximate bytes held by the graph.
+    """
+    @staticmethod
+    def count_edges_by_type(G) -> dict:
+        layers = getattr(G, "layers", None)
+        if layers is not None:
+            # CSRMultiDiGraph
+            return {edge_type: len(layer) for edge_type, layer in layers.items()}
+        if IndexedMultiDiGraph.indexes_of(G) is not None:
+            return {edge_type: sum(len(successors) for successors in layer.values())
+                    for edge_type, layer in G._succ_by_edge_type.items() if layer}
+        counts = {}
+        for _, _, edge_type in G.edges(keys=True):
+            counts[edge_type] = counts.get(edge_type, 0) + 1
+        return counts
+
+    @staticmethod
+    def approximate_bytes(G) -> int:
+        """
+        Bytes of the objects reachable from the graph, each counted once. Memory-mapped sources and
+        interpreter-wide objects such as the None singleton are not excluded, so this is an estimate.
+        Walks every object of the graph, it takes about as long as a graph copy.
+        """
+        seen = set()
+        size = 0
+        stack = [G]
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+
+            if isinstance(obj, np.ndarray):
+                # Includes the data unless the array is a view, whose base is walked instead
+                size += sys.getsizeof(obj)
+                if obj.base is not None:
+                    stack.append(obj.base)
+                continue
+            size += sys.getsizeof(obj)
+
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+            elif isinstance(obj, (str, bytes, int, float, bool, type(None))):
+                continue
+            else:
+                if hasattr(obj, "__dict__"):
+                    stack.append(obj.__dict__)
+                for slot in getattr(type(obj), "__slots__", ()):
+                    if hasattr(obj, slot):
+                        stack.append(getattr(obj, slot))
+        return size
+
+class StageStats:
+    """
+    Wall time, graph size and memory use recorded at the end of each CLI stage.
+
+    Peak RSS is the process high-water mark so far, and for worker processes that of the largest one that ended.
+    With trace_memory, tracemalloc also reports the peak of Python allocations within each stage and the graph
+    size in bytes is estimated, both of which slow the run down noticeably. tracemalloc only sees the main process,
+    stages run in workers show their parsing in the workers' peak RSS instead. Call close(), or use the stats as a
+    context manager, to stop tracing.
+    """
+    def __init__(self, trace_memory: bool=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.last_time = time.time()
+        if trace_memory:
+            tracemalloc.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @staticmethod
+    def get_peak_rss_bytes(children: bool=False) -> int:
+        """
+        Peak RSS of this process, or of its largest ended child with `children`. None where resource is missing.
+        """
+        if resource is None:
+            return None
+        # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss * scale
+
+    def record(self, stage_name: str, G=None):
+        stage = {"stage": stage_name, "seconds": time.time() - self.last_time,
+                 "peak_rss_bytes": self.get_peak_rss_bytes(),
+                 "workers_peak_rss_bytes": self.get_peak_rss_bytes(children=True)}
+        if G is not None:
+            stage["nodes"] = G.number_of_nodes()
+            stage["edges"] = GraphSize.count_edges_by_type(G)
+        if self.trace_memory:
+            _, stage["traced_peak_bytes"] = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            if G is not None:
+                stage["graph_bytes"] = GraphSize.approximate_bytes(G)
+        self.stages.append(stage)
+        # The accounting above is not part of the next stage
+        self.last_time = time.time()
+
+    def write_json(self, output_path):
+        with open(output_path, "w") as f:
+            json.dump({"stages": self.stages}, f, indent=2)
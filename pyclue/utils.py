@@ -1,6 +1,9 @@
-import os, hashlib
+import os, hashlib, mmap, codecs
 from pathlib import Path
 
+NODE_ORDINAL_BITS = 32
+NODE_ORDINAL_MASK = (1 << NODE_ORDINAL_BITS) - 1
+
 def traverse_directory(directory, restrict_extensions: list=None, ignore_dirs: list = []):
     for root, dirs, files in os.walk(directory):
         # Exclude the directories listed in ignore_dirs
@@ -21,9 +24,77 @@ def get_file_bytes(file_extension, file_path) -> bytes:
         raise FileNotFoundError(f"The file {file_path} does not exist.")
     
     file_bytes = file.read_bytes()
-    file_bytes_str = file_bytes.decode(encoding="utf8")
+    validate_utf8(file_bytes)
+
+    return file_bytes
+
+def get_file_mmap(file_path):
+    """
+    Memory-map a file read-only, falling back to an empty bytes object for empty files
+    (which cannot be mapped). The caller is responsible for closing the returned map.
+    """
+    file = Path(file_path)
+    
+    if not file.is_file():
+        raise FileNotFoundError(f"The file {file_path} does not exist.")
+    
+    with open(file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        file_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    try:
+        validate_utf8(file_map)
+    except UnicodeDecodeError:
+        file_map.close()
+        raise
+    
+    return file_map
+
+def validate_utf8(buffer, chunk_size: int=1 << 20):
+    """
+    Validate that a bytes-like buffer is UTF-8 in a single pass without keeping the decoded text.
+    Raises UnicodeDecodeError on invalid input.
+    """
+    decoder = codecs.getincrementaldecoder("utf8")()
+    with memoryview(buffer) as view:
+        for offset in range(0, len(view), chunk_size):
+            decoder.decode(view[offset : offset + chunk_size])
+    decoder.decode(b"", final=True)
+
+def common_prefix_length(a: bytes, b: bytes) -> int:
+    """
+    Length of the common prefix of two byte strings, found by binary search over slice comparisons.
+    """
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[low:mid] == b[low:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
 
-    return bytes(file_bytes_str, encoding="utf8")
+def common_suffix_length(a: bytes, b: bytes, limit: int) -> int:
+    """
+    Length of the common suffix of two byte strings, at most `limit` bytes.
+    """
+    low, high = 0, min(len(a), len(b), limit)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid : len(a) - low] == b[len(b) - mid : len(b) - low]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+def byte_offset_to_point(src_bytes: bytes, byte_offset: int) -> tuple[int, int]:
+    """
+    Tree-sitter (row, column) point of a byte offset, where the column is counted in bytes.
+    """
+    row = src_bytes.count(b"\n", 0, byte_offset)
+    column = byte_offset - (src_bytes.rfind(b"\n", 0, byte_offset) + 1)
+    return row, column
 
 def get_relative_path(path, base_path):
     return os.path.relpath(path, base_path)
@@ -42,6 +113,32 @@ def generate_uuid(string: str, length: int=24) -> str:
     # Return the UUID as a string
     return hex_digest[:length]
 
+def generate_file_id(rel_path: str) -> int:
+    """
+    Stable 32-bit identifier of a file, derived from its repository relative path.
+    """
+    rel_path = rel_path.replace(os.sep, "/")
+    return int.from_bytes(hashlib.sha256(rel_path.encode("utf-8")).digest()[:4], "big")
+
+def pack_node_id(file_id: int, ordinal: int) -> int:
+    """
+    Pack a 32-bit file ID and a 32-bit node ordinal within that file into a single 64-bit node ID.
+    """
+    return (file_id << NODE_ORDINAL_BITS) | ordinal
+
+def unpack_node_id(node_id: int) -> tuple[int, int]:
+    return node_id >> NODE_ORDINAL_BITS, node_id & NODE_ORDINAL_MASK
+
+def generate_legacy_node_id(rel_path: str, node_type: str, start_byte: int, end_byte: int, dummy_str: str=None) -> str:
+    """
+    The string node ID used before integer IDs, kept for export compatibility.
+    """
+    string_to_hash = f"{rel_path}.{node_type}.{start_byte}.{end_byte}"
+    if dummy_str:
+        string_to_hash += f".{dummy_str}"
+    
+    return generate_uuid(string_to_hash)
+
 def module_path_to_dotted_name(module_path: str) -> str:
     if module_path is None:
         return None
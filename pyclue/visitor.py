@@ -1,7 +1,10 @@
 import networkx as nx
+import heapq
 from collections import deque, defaultdict
 
-from constants import TSNodeGroup, EdgeType
+from constants import TSNodeGroup, EdgeType, DummyNode
+from source_store import SourceStore
+from indexed_graph import IndexedMultiDiGraph
 
 class GraphVisitor:
     @staticmethod
@@ -17,6 +20,57 @@ class GraphVisitor:
         """
         return G.nodes[node_id]
     
+    @staticmethod
+    def get_node_text(G: nx.MultiDiGraph, node_id: int):
+        """
+        Get the text of a node. Nodes generated in lazy text mode read it from the graph's SourceStore.
+
+        Args:
+            G (nx.MultiDiGraph): The MultiDiGraph containing the node.
+            node_id (int): The ID of the node.
+
+        Returns:
+            Union[str, None]: The text of the node, or None for nodes without text.
+        """
+        n_data = G.nodes[node_id]
+        if SourceStore.FILE_INDEX in n_data:
+            return G.graph[SourceStore.GRAPH_KEY].get_node_text(n_data)
+        return n_data.get("text")
+    
+    @staticmethod
+    def get_node_module(G: nx.MultiDiGraph, node_id: int):
+        """
+        Get the relative path of the module a node belongs to.
+
+        Args:
+            G (nx.MultiDiGraph): The MultiDiGraph containing the node.
+            node_id (int): The ID of the node.
+
+        Returns:
+            str: The relative path of the node's module.
+        """
+        n_data = G.nodes[node_id]
+        if SourceStore.FILE_INDEX in n_data:
+            return G.graph[SourceStore.GRAPH_KEY].get_module(n_data[SourceStore.FILE_INDEX])
+        return n_data.get("module")
+    
+    @staticmethod
+    def get_node_properties(G: nx.MultiDiGraph, node_id: int) -> dict:
+        """
+        Get all properties of a node, with the text, points and module of lazy text mode nodes filled in.
+
+        Args:
+            G (nx.MultiDiGraph): The MultiDiGraph containing the node.
+            node_id (int): The ID of the node.
+
+        Returns:
+            dict: The properties of the node.
+        """
+        n_data = G.nodes[node_id]
+        if SourceStore.FILE_INDEX in n_data:
+            return G.graph[SourceStore.GRAPH_KEY].materialize(n_data)
+        return n_data
+    
     @staticmethod
     def update_node(G: nx.MultiDiGraph, node_id: int, attributes: dict):
         """
@@ -48,6 +102,13 @@ class GraphVisitor:
             Union[G.Node, Tuple[G.Node, dict]]: The child node with the specified type name,
             optionally with its data if data is True.
         """
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            children = indexed_G.get_ast_children_by_type(node, type)
+            if children:
+                return (children[0], G.nodes[children[0]]) if data else children[0]
+            return None
+        
         children = GraphVisitor.immediate_successors(G, node)
         for n in children:
             if G.nodes[n]['type'] == type:
@@ -69,8 +130,16 @@ class GraphVisitor:
             List[Union[G.Node, Tuple[G.Node, dict]]]: A list of child nodes with the specified type names,
             optionally with their data if data is True.
         """
-        children = GraphVisitor.immediate_successors(G, node)
-        matched_children = [n for n in children if G.nodes[n].get('type') in types]
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            matched_children = set()
+            for type in types:
+                matched_children.update(indexed_G.get_ast_children_by_type(node, type))
+            # Keep the children in edge order, as a scan of the successors would
+            matched_children = [n for n in G.successors(node) if n in matched_children] if matched_children else []
+        else:
+            children = GraphVisitor.immediate_successors(G, node)
+            matched_children = [n for n in children if G.nodes[n].get('type') in types]
         if data:
             return [(n, G.nodes[n]) for n in matched_children]
         return matched_children
@@ -90,6 +159,13 @@ class GraphVisitor:
             Union[G.Node, Tuple[G.Node, dict]]: The child node with the specified field name, 
             optionally with its data if with_data is True.
         """
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            children = indexed_G.get_ast_children_by_field_name(node, field_name)
+            if children:
+                return (children[0], G.nodes[children[0]]) if data else children[0]
+            return None
+        
         children = GraphVisitor.immediate_successors(G, node)
         for n in children:
             if G.nodes[n].get('field_name') == field_name:
@@ -110,8 +186,12 @@ class GraphVisitor:
             List[Union[G.Node, Tuple[G.Node, dict]]]: A list of child nodes with the specified field name,
             optionally with their data if data is True.
         """
-        children = GraphVisitor.immediate_successors(G, node)
-        matched_children = [n for n in children if G.nodes[n].get('field_name') == field_name]
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            matched_children = list(indexed_G.get_ast_children_by_field_name(node, field_name))
+        else:
+            children = GraphVisitor.immediate_successors(G, node)
+            matched_children = [n for n in children if G.nodes[n].get('field_name') == field_name]
         if data:
             return [(n, G.nodes[n]) for n in matched_children]
         return matched_children
@@ -129,11 +209,46 @@ class GraphVisitor:
         Returns:
             Union[str, None]: The parent node ID if found, otherwise None.
         """
-        for predecessor in G.predecessors(node):
-            if G.has_edge(predecessor, node, key=edge_type):
-                return predecessor
+        for predecessor in GraphVisitor.get_predecessors_by_edge_type(G, node, edge_type):
+            return predecessor
         return None
     
+    @staticmethod
+    def get_successors_by_edge_type(G: nx.MultiDiGraph, node: str, edge_type: str) -> list:
+        """
+        Get the successors of a node over edges of a specific type, in edge insertion order.
+
+        Args:
+            G (nx.MultiDiGraph): The MultiDiGraph to search in.
+            node (str): The ID of the node.
+            edge_type (str): The type of the edges to follow.
+
+        Returns:
+            List: The successor node IDs. Do not modify it, it can be the graph's own adjacency list.
+        """
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            return indexed_G.get_successors_by_edge_type(node, edge_type)
+        return [successor for successor, keydict in G.adj[node].items() if edge_type in keydict]
+    
+    @staticmethod
+    def get_predecessors_by_edge_type(G: nx.MultiDiGraph, node: str, edge_type: str) -> list:
+        """
+        Get the predecessors of a node over edges of a specific type, in edge insertion order.
+
+        Args:
+            G (nx.MultiDiGraph): The MultiDiGraph to search in.
+            node (str): The ID of the node.
+            edge_type (str): The type of the edges to follow.
+
+        Returns:
+            List: The predecessor node IDs. Do not modify it, it can be the graph's own adjacency list.
+        """
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            return indexed_G.get_predecessors_by_edge_type(node, edge_type)
+        return [predecessor for predecessor, keydict in G.pred[node].items() if edge_type in keydict]
+    
     @staticmethod
     def get_nodes_by_type(G: nx.MultiDiGraph, node_type: str):
         """
@@ -146,8 +261,30 @@ class GraphVisitor:
         Returns:
             List: A list of node IDs that have the specified type.
         """
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            return indexed_G.get_nodes_by_type(node_type)
+        
         return [node_id for node_id, node_data in G.nodes(data=True) if node_data['type'] == node_type]
     
+    @staticmethod
+    def get_dummy_nodes(G: nx.MultiDiGraph, field_name: str):
+        """
+        Get the dummy nodes with a specific field name (START, EXIT, ENTRY or RETURN) from a MultiDiGraph.
+
+        Parameters:
+            G (nx.MultiDiGraph): The MultiDiGraph to search for nodes.
+            field_name (str): The field name of the dummy nodes to retrieve.
+
+        Returns:
+            List: A list of dummy node IDs that have the specified field name.
+        """
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            return indexed_G.get_dummy_nodes_by_field_name(field_name)
+        
+        return [n for n in GraphVisitor.get_nodes_by_type(G, TSNodeGroup.DUMMY) if G.nodes[n].get('field_name') == field_name]
+    
     @staticmethod
     def get_nodes_by_types(G: nx.MultiDiGraph, node_types: list):
         """
@@ -195,6 +332,32 @@ class GraphVisitor:
 
         return result
     
+    @staticmethod
+    def find_descendants_by_type(G: nx.MultiDiGraph, source_node: str, target_type: str) -> list:
+        """
+        Find the source node and its descendants of a type, following AST edges only so the search stays within
+        the source node's subtree. Results are memoized by indexed graphs.
+
+        Parameters:
+            G (nx.MultiDiGraph): The graph to search in.
+            source_node (str): The root of the subtree.
+            target_type (str): The type of the nodes to find.
+
+        Returns:
+            List[str]: The IDs of the nodes with the specified type, in breadth-first order. Do not modify it.
+        """
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if indexed_G is not None:
+            return indexed_G.get_ast_descendants_by_type(source_node, target_type)
+        
+        result = []
+        queue = [source_node]
+        for current_node in queue:
+            if G.nodes[current_node]['type'] == target_type:
+                result.append(current_node)
+            queue.extend(GraphVisitor.get_successors_by_edge_type(G, current_node, EdgeType.AST))
+        return result
+    
     @staticmethod
     def generate_subgraph(G: nx.MultiDiGraph, start_node, edge_type = EdgeType.AST):
         """
@@ -246,7 +409,7 @@ class GraphVisitor:
         Returns:
             List[Tuple[str, str, str]]: A list of tuples representing the edges (source, target, edge_type).
         """
-        return [(u, v, k) for u, v, k in G.out_edges(node, keys=True) if k == edge_type]
+        return [(node, v, edge_type) for v in GraphVisitor.get_successors_by_edge_type(G, node, edge_type)]
 
     @staticmethod
     def get_indegree_edges_by_type(G: nx.MultiDiGraph, node: str, edge_type: str):
@@ -261,7 +424,7 @@ class GraphVisitor:
         Returns:
             List[Tuple[str, str, str]]: A list of tuples representing the edges (source, target, edge_type).
         """
-        return [(u, v, k) for u, v, k in G.in_edges(node, keys=True) if k == edge_type]
+        return [(u, node, edge_type) for u in GraphVisitor.get_predecessors_by_edge_type(G, node, edge_type)]
     
     @staticmethod
     def immediate_successors(G: nx.MultiDiGraph, node: str, filter_by_type: list=None, sort=False):
@@ -277,7 +440,12 @@ class GraphVisitor:
         Yields:
             successor: The immediate successor of the given node.
         """
-        successors = G.successors(node)
+        indexed_G = IndexedMultiDiGraph.indexes_of(G)
+        if sort and indexed_G is not None:
+            successors = GraphVisitor._source_ordered_successors(indexed_G, node)
+            sort = False
+        else:
+            successors = G.successors(node)
         
         if filter_by_type:
             successors = [s for s in successors if G.nodes[s]['type'] in filter_by_type]
@@ -288,6 +456,22 @@ class GraphVisitor:
         for successor in successors:
             yield successor
 
+    @staticmethod
+    def _source_ordered_successors(G: IndexedMultiDiGraph, node: str):
+        """
+        Successors of a node by source position, from the graph's pre-sorted AST children.
+        CF and DF successors, if any, are merged in by their position.
+        """
+        ast_children = G.get_successors_by_edge_type(node, EdgeType.AST)
+        successors = list(G.successors(node))
+        if len(successors) == len(ast_children):
+            return ast_children
+        
+        ast_children_set = set(ast_children)
+        others = sorted((s for s in successors if s not in ast_children_set),
+                        key=lambda s: G.nodes[s]['src_bytes_range'][0])
+        return heapq.merge(ast_children, others, key=lambda s: G.nodes[s]['src_bytes_range'][0])
+
     @staticmethod
     def immediate_predecessors(G: nx.MultiDiGraph, node: str, filter_by_type: list=None, sort=False):
         """
@@ -491,6 +675,27 @@ class GraphTreeVisitor:
         
         return object_node, attribute_nodes
     
+    @staticmethod
+    def get_enclosing_block(G: nx.MultiDiGraph, node: str):
+        """
+        Get the START or ENTRY dummy node of the module, class or function block that contains a node.
+
+        Parameters:
+            G (nx.MultiDiGraph): The graph to search in.
+            node (str): The node to start climbing the AST from.
+
+        Returns:
+            Union[str, None]: The dummy node of the enclosing block, or None if there is none.
+        """
+        while node is not None:
+            node_type = G.nodes[node]['type']
+            if node_type in [TSNodeGroup.MODULE, TSNodeGroup.CLS_NODE]:
+                return GraphVisitor.get_child_by_field_name(G, node, DummyNode.START)
+            elif node_type == TSNodeGroup.FN_NODE:
+                return GraphVisitor.get_child_by_field_name(G, node, DummyNode.ENTRY)
+            node = GraphVisitor.get_parent(G, node, EdgeType.AST)
+        return None
+    
 class NXAlgorithms:
     
     @staticmethod
@@ -506,6 +711,37 @@ class NXAlgorithms:
         """     
         return list(reversed(list(nx.topological_sort(G))))
     
+    @staticmethod
+    def postorder_by_edge_type(G: nx.MultiDiGraph, source, edge_type=EdgeType.AST) -> list:
+        """
+        Nodes reachable from the source over edges of a specific type, in post-order: every node comes after
+        its successors, and siblings in edge order (source order for AST children of an indexed graph).
+        Iterative, so deep trees do not hit the recursion limit, and no subgraph is built.
+
+        Parameters:
+        - source: Node to start from, it is the last node of the order.
+        - edge_type (str): Type of the edge to follow.
+
+        Returns:
+        - order (list): List of nodes in the resolved order.
+        """
+        order = []
+        visited = {source}
+        stack = [(source, iter(GraphVisitor.get_successors_by_edge_type(G, source, edge_type)))]
+        
+        while stack:
+            node, successors = stack[-1]
+            for successor in successors:
+                if successor not in visited:
+                    visited.add(successor)
+                    stack.append((successor, iter(GraphVisitor.get_successors_by_edge_type(G, successor, edge_type))))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+        
+        return order
+    
     @staticmethod
     def get_successors(G: nx.MultiDiGraph, node, edge_type=EdgeType.AST):
         """
@@ -519,16 +755,7 @@ class NXAlgorithms:
         Returns:
         list: A list of successor nodes.
         """
-        successors = []
-        for succ in G.successors(node):
-            # Check all edges between node and succ
-            edges = G.get_edge_data(node, succ)
-            for key in edges.keys():
-                if key == edge_type:
-                    successors.append(succ)
-                    break  # No need to check other edges if one matches the type
-                
-        return successors
+        return list(GraphVisitor.get_successors_by_edge_type(G, node, edge_type))
     
     @staticmethod
     def get_subsequent_successors(G: nx.MultiDiGraph, node, edge_type, visited=None):
@@ -572,8 +799,8 @@ class NXAlgorithms:
             current_node = queue.popleft()
             visited.add(current_node)
             
-            for _, successor, e_type in G.out_edges(current_node, keys=True):
-                if e_type == edge_type and successor not in visited:
+            for successor in GraphVisitor.get_successors_by_edge_type(G, current_node, edge_type):
+                if successor not in visited:
                     successors[current_node].append(successor)
                     if successor not in queue:
                         queue.append(successor)
@@ -582,6 +809,40 @@ class NXAlgorithms:
             if successors[current_node]:
                 yield (current_node, successors[current_node])
     
+    @staticmethod
+    def forward_in_degrees(G: nx.MultiDiGraph, source, edge_type) -> dict:
+        """
+        Count the predecessors of every node reachable from the source over edges of a specific type,
+        leaving out back edges (edges to a node on the current DFS path, which close loops).
+        Predecessors that can not be reached from the source are not counted either.
+        
+        :param G: The NetworkX MultiDiGraph.
+        :param source: The source node to start from.
+        :param edge_type: The edge type to filter by.
+        :return: Dict of node -> number of forward predecessors, the source has 0.
+        """
+        in_degrees = {source: 0}
+        on_path = {source}
+        stack = [(source, iter(GraphVisitor.get_successors_by_edge_type(G, source, edge_type)))]
+        
+        while stack:
+            node, successors = stack[-1]
+            for successor in successors:
+                if successor in on_path:
+                    continue  # back edge
+                if successor in in_degrees:
+                    in_degrees[successor] += 1
+                    continue
+                in_degrees[successor] = 1
+                on_path.add(successor)
+                stack.append((successor, iter(GraphVisitor.get_successors_by_edge_type(G, successor, edge_type))))
+                break
+            else:
+                stack.pop()
+                on_path.discard(node)
+        
+        return in_degrees
+    
     @staticmethod
     def dfs_successors_by_edge_property(G: nx.MultiDiGraph, source, edge_type):
         """
@@ -589,55 +850,54 @@ class NXAlgorithms:
         based on a specific edge property. Ensures that nodes with multiple in-degrees 
         are fully explored only after all their predecessors are explored.
         
+        Predecessors are tracked with counters from forward_in_degrees, so the walk is linear in the
+        number of nodes and edges. Back edges are not waited on: a loop header is visited once the
+        edges entering the loop are, and the back edge is skipped when its source is visited.
+        
         :param G: The NetworkX MultiDiGraph.
         :param source: The source node to start the DFS.
         :param edge_type: The edge type to filter by.
         :yield: Tuples of (current_node, list_of_successors, delayed_nodes) for each matching edge.
         """
+        remaining = NXAlgorithms.forward_in_degrees(G, source, edge_type)
         visited = set()
         stack = [source]
-        delayed_nodes = {}  # Keep track of nodes with multiple predecessors
-
+        delayed_nodes = {}  # Nodes waiting for predecessors -> order in which they were delayed
+        delay_count = 0
+        
         while stack:
             current_node = stack.pop()
-
-            ## Filter in-edges based on edge_type and count them
-            in_edges_with_type = [
-                (pred, edge_key) for pred, _, edge_key in G.in_edges(current_node, keys=True)
-                if edge_key == edge_type
-            ]
-            in_degree = len(in_edges_with_type)
+            if current_node in visited:
+                continue
             
-            if in_degree > 1 and current_node not in visited:
+            if remaining[current_node] > 0:
                 # Delay visiting this node until all predecessors are visited
-                if any(pred not in visited for pred, _ in in_edges_with_type):
-                    delayed_nodes[current_node] = True
-                    continue
-
-            if current_node not in visited:
-                visited.add(current_node)
-                
-                # Gather all successors based on the edge_type
-                successors = []
-                for _, successor, e_type in G.out_edges(current_node, keys=True):
-                    if e_type == edge_type:
-                        successors.append(successor)
-                
-                # Yield the current node, its successors, and the delayed nodes
-                yield current_node, successors, list(delayed_nodes.keys())
-
-                # Add successors to the stack (in reverse order to maintain DFS behavior)
-                for successor in reversed(successors):
-                    if successor not in visited:
-                        stack.append(successor)
-
-            # Reprocess delayed nodes if their predecessors are fully visited
-            for delayed_node in list(delayed_nodes):
-                # Recheck predecessors with the given edge_type
-                in_edges_for_delayed = [
-                    (pred, edge_key) for pred, _, edge_key in G.in_edges(delayed_node, keys=True)
-                    if edge_key == edge_type
-                ]
-                if all(pred in visited for pred, _ in in_edges_for_delayed):
-                    stack.append(delayed_node)
-                    del delayed_nodes[delayed_node]
+                if current_node not in delayed_nodes:
+                    delayed_nodes[current_node] = delay_count
+                    delay_count += 1
+                continue
+            
+            visited.add(current_node)
+            
+            # Gather all successors based on the edge_type
+            successors = list(GraphVisitor.get_successors_by_edge_type(G, current_node, edge_type))
+            
+            # Yield the current node, its successors, and the delayed nodes
+            yield current_node, successors, list(delayed_nodes)
+            
+            # Add successors to the stack (in reverse order to maintain DFS behavior)
+            for successor in reversed(successors):
+                if successor not in visited:
+                    stack.append(successor)
+            
+            # Release delayed nodes whose last predecessor this was, in the order they were delayed
+            released = []
+            for successor in successors:
+                if successor in visited:
+                    continue  # back edge
+                remaining[successor] -= 1
+                if remaining[successor] == 0 and successor in delayed_nodes:
+                    released.append(successor)
+            for delayed_node in sorted(released, key=delayed_nodes.get):
+                stack.append(delayed_node)
+                del delayed_nodes[delayed_node]
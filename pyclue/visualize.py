@@ -1,5 +1,7 @@
 import networkx as nx
 
+from visitor import GraphVisitor
+
 NODE_COLOR_MAP = {
     "module": "purple",
     "class_definition": "darkgreen",
@@ -34,13 +36,16 @@ EDGE_COLOR_MAP = {
 }
     
 def render(G: nx.MultiDiGraph, output_path: str):
+    if not isinstance(G, nx.MultiDiGraph):
+        # Other graph backends are drawn through a networkx copy
+        G = G.to_networkx()
     A = nx.nx_agraph.to_agraph(G)
     
     # Add node and edge data to label
     for node in G.nodes:
         n = A.get_node(node)
         
-        node_data = G.nodes[node]
+        node_data = GraphVisitor.get_node_properties(G, node)
         label = create_label(node_data)
         n.attr['label'] = label
         
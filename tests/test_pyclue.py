@@ -1,8 +1,22 @@
 import pytest
 import os
+import sys
+import subprocess
+import tracemalloc
+import shutil
 import json
 import networkx as nx
 from pyclue.code_property_graph import CodePropertyGraph
+from pyclue.abstract_syntax_tree import AbstractSyntaxTree
+from pyclue.ast_cache import ASTCache
+from pyclue.definitions_cache import DefinitionsCache
+from pyclue.incremental import IncrementalCodePropertyGraph
+from pyclue.visitor import GraphVisitor, NXAlgorithms
+from pyclue.node_records import CompactMultiDiGraph
+from pyclue.indexed_graph import IndexedMultiDiGraph
+from pyclue.csr_graph import CSRMultiDiGraph
+from pyclue.stats import GraphSize, StageStats
+from pyclue import sequence_manager as sm
 
 def test_cpg():
     # test_dir = 'repos/toy_project_1'
@@ -16,6 +30,374 @@ def test_cpg():
     assert_edges_equal(test_cpg, truth_cpg, edge_type='CF')
     assert_edges_equal(test_cpg, truth_cpg, edge_type='DF')
     
+@pytest.mark.parametrize("parse_mode", ["buffer", "mmap"])
+def test_parse_modes_match_callback(parse_mode):
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    
+    for file_name in ['constants.py', 'main.py', 'shapes.py']:
+        file_path = os.path.join(test_dir, file_name)
+        with AbstractSyntaxTree(test_dir, file_path, parse_mode="callback") as ast:
+            expected = ast.generate_nodes_and_edges(ast.tree.root_node)
+        with AbstractSyntaxTree(test_dir, file_path, parse_mode=parse_mode) as ast:
+            assert ast.generate_nodes_and_edges(ast.tree.root_node) == expected
+    
+def test_ast_cache_hits_match_parsed_graph(tmp_path):
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    
+    cold_cache = ASTCache(tmp_path)
+    cold_cpg = CodePropertyGraph(dir=test_dir, ast_cache=cold_cache)
+    cold_cpg.generate_asts()
+    
+    warm_cache = ASTCache(tmp_path)
+    warm_cpg = CodePropertyGraph(dir=test_dir, ast_cache=warm_cache)
+    warm_cpg.generate_asts()
+    
+    assert (cold_cache.hits, cold_cache.misses) == (0, 3)
+    assert (warm_cache.hits, warm_cache.misses) == (3, 0)
+    assert dict(warm_cpg.graph.nodes(data=True)) == dict(cold_cpg.graph.nodes(data=True))
+    assert set(warm_cpg.graph.edges(keys=True)) == set(cold_cpg.graph.edges(keys=True))
+    
+def test_definitions_cache_reuses_unchanged_modules(tmp_path):
+    repo_dir = tmp_path / "repo"
+    shutil.copytree(os.path.join(os.path.dirname(__file__), 'repos/toy_project_1'), repo_dir)
+    
+    def generate(cache):
+        return Utils.generate_cpg(str(repo_dir), workers=1, definitions_cache=cache)
+    
+    plain_cpg = generate(None)
+    cold_cache, warm_cache, changed_cache = (DefinitionsCache(tmp_path / "cache") for _ in range(3))
+    generate(cold_cache)
+    warm_cpg = generate(warm_cache)
+    
+    assert (cold_cache.hits, cold_cache.misses) == (0, 3)
+    assert (warm_cache.hits, warm_cache.misses) == (3, 0)
+    assert list(warm_cpg.graph.edges(keys=True)) == list(plain_cpg.graph.edges(keys=True))
+    
+    with open(repo_dir / "shapes.py", "a") as f:
+        f.write("\nEXTRA = 1\n")
+    generate(changed_cache)
+    assert (changed_cache.hits, changed_cache.misses) == (2, 1)
+
+def test_cache_keys_follow_package_source(monkeypatch):
+    ast_key = ASTCache.generate_key("shapes.py", b"x = 1\n")
+    definitions_key = DefinitionsCache.generate_key("shapes.py", b"x = 1\n")
+    assert DefinitionsCache.generate_key("shapes.py", b"x = 1\n") == definitions_key
+    # The package imports ast_cache as a top level module
+    monkeypatch.setattr(sys.modules['ast_cache'].ASTCache, "source_version", staticmethod(lambda: "other"))
+    assert sys.modules['ast_cache'].ASTCache.generate_key("shapes.py", b"x = 1\n") != ast_key
+    assert DefinitionsCache.generate_key("shapes.py", b"x = 1\n") != definitions_key
+
+def test_incremental_update_matches_full_build(tmp_path, monkeypatch):
+    test_dir = str(tmp_path / 'toy_project_1')
+    shutil.copytree(os.path.join(os.path.dirname(__file__), 'repos/toy_project_1'), test_dir)
+    
+    incremental_cpg = IncrementalCodePropertyGraph(Utils.generate_cpg(test_dir))
+    # The package imports abstract_syntax_tree as a top level module
+    tree_class = sys.modules['abstract_syntax_tree'].AbstractSyntaxTree
+    reparsed = []
+    reparse = tree_class.reparse
+    monkeypatch.setattr(tree_class, 'reparse', lambda self, src_bytes: reparsed.append(self.path) or reparse(self, src_bytes))
+    shapes_path = os.path.join(test_dir, 'shapes.py')
+    with open(shapes_path, 'a') as f:
+        f.write("\nclass Triangle:\n    def __init__(self, base):\n        self.base = base\n")
+    changed, deleted = incremental_cpg.poll_changes()
+    for file_path in changed:
+        incremental_cpg.update_file(file_path)
+    assert reparsed == [shapes_path]
+    
+    full_graph = Utils.generate_cpg(test_dir).graph
+    assert dict(incremental_cpg.graph.nodes(data=True)) == dict(full_graph.nodes(data=True))
+    assert set(incremental_cpg.graph.edges(keys=True)) == set(full_graph.edges(keys=True))
+    
+def test_file_id_collisions_get_distinct_ids(monkeypatch):
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+
+    graph = Utils.generate_cpg(test_dir).graph
+    # The package imports utils as a top level module
+    monkeypatch.setattr(sys.modules['utils'], 'generate_file_id', lambda rel_path: 7)
+    collided_cpg = Utils.generate_cpg(test_dir)
+
+    file_ids = [file_id for file_id, _ in collided_cpg.file_node_counts.values()]
+    assert sorted(file_ids) == list(range(7, 7 + len(file_ids)))
+    assert collided_cpg.graph.number_of_nodes() == graph.number_of_nodes()
+    for edge_type in ['AST', 'CF', 'DF']:
+        assert (sum(1 for _, _, k in collided_cpg.graph.edges(keys=True) if k == edge_type)
+                == sum(1 for _, _, k in graph.edges(keys=True) if k == edge_type))
+
+def test_pipeline_matches_serial_generation():
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    
+    serial_graph = Utils.generate_cpg(test_dir).graph
+    pipeline_cpg = Utils.generate_cpg(test_dir, pipeline=True)
+    
+    assert dict(pipeline_cpg.graph.nodes(data=True)) == dict(serial_graph.nodes(data=True))
+    assert list(pipeline_cpg.graph.edges(keys=True)) == list(serial_graph.edges(keys=True))
+    
+def test_lazy_text_matches_eager_text():
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    
+    eager_graph = Utils.generate_cpg(test_dir).graph
+    lazy_cpg = Utils.generate_cpg(test_dir, lazy_text=True)
+    
+    assert 'text' not in next(iter(lazy_cpg.graph.nodes.values()))
+    for n, n_data in eager_graph.nodes(data=True):
+        assert GraphVisitor.get_node_properties(lazy_cpg.graph, n) == n_data
+    assert set(lazy_cpg.graph.edges(keys=True)) == set(eager_graph.edges(keys=True))
+    
+def test_compact_node_records_behave_like_dicts():
+    G = CompactMultiDiGraph()
+    G.add_nodes_from([(1, {"type": "identifier", "field_name": None, "src_bytes_range": (0, 3)}),
+                      (2, {"type": "list", "src_bytes_range": [0, 3], "custom": {"a": 1}})])
+    G.nodes[1]["inferred_type"] = "int"
+    G.nodes[2]["src_bytes_range"] = (1, 2)
+    del G.nodes[2]["type"]
+    
+    assert list(G.nodes[1].items()) == [("type", "identifier"), ("field_name", None), ("src_bytes_range", (0, 3)), ("inferred_type", "int")]
+    assert G.nodes[2] == {"src_bytes_range": (1, 2), "custom": {"a": 1}}
+    assert G.nodes[2].get("type") is None and "type" not in G.nodes[2]
+    
+def test_compact_nodes_match_dict_nodes():
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    
+    dict_graph = Utils.generate_cpg(test_dir).graph
+    compact_cpg = Utils.generate_cpg(test_dir, compact_nodes=True)
+    
+    assert dict(compact_cpg.graph.nodes(data=True)) == dict(dict_graph.nodes(data=True))
+    assert list(compact_cpg.graph.edges(keys=True)) == list(dict_graph.edges(keys=True))
+    
+def test_csr_backend_matches_networkx_backend():
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    
+    nx_graph = Utils.generate_cpg(test_dir).graph
+    csr_cpg = Utils.generate_cpg(test_dir, backend="csr")
+    
+    assert dict(csr_cpg.graph.nodes(data=True)) == dict(nx_graph.nodes(data=True))
+    for edge_type in ['AST', 'CF', 'DF']:
+        assert_edges_equal(csr_cpg.graph, nx_graph, edge_type=edge_type)
+    assert list(csr_cpg.graph.edges(keys=True)) == list(nx_graph.edges(keys=True))
+    with pytest.raises(TypeError):
+        IncrementalCodePropertyGraph(csr_cpg)
+    
+def test_parallel_cfg_and_dfg_match_serial_generation():
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    
+    edges = []
+    for workers in [1, 2]:
+        edges.append(list(Utils.generate_cpg(test_dir, workers=workers).graph.edges(keys=True)))
+    
+    for edge_type in ['CF', 'DF']:
+        assert any(key == edge_type for _, _, key in edges[0])
+    assert edges[0] == edges[1]
+
+    # Blocks come by type, so the files of modules, classes and functions interleave
+    blocks = [(file_id << 32) | ordinal for ordinal in [1, 5, 9] for file_id in [3, 1, 2]]
+    tasks = CodePropertyGraph._split_blocks_by_module(CodePropertyGraph._order_blocks_by_file(blocks), 3)
+    assert [{n >> 32 for n in task} for task in tasks] == [{3}, {1}, {2}]
+
+def test_sequence_chains_conditions_and_branch_tails():
+    branch_s, else_s = sm.Sequence(), sm.Sequence()
+    branch_s.add_item(sm.Node(11))
+    else_s.add_item(sm.Node(21))
+    cond_s = sm.ConditionalSequence()
+    cond_s.add_sequence(10, branch_s)
+    cond_s.add_sequence("else", else_s)
+    
+    s = sm.Sequence()
+    s.add_item(cond_s)
+    s.add_item(sm.Node(30))
+    s.add_at_start(sm.Node(1))
+    s.generate_edges("CF")
+    
+    assert s.edges == [(10, 11, "CF"), (10, 21, "CF"), (1, 10, "CF"), (11, 30, "CF"), (21, 30, "CF")]
+    assert not hasattr(sm.Node(1), "__dict__")
+    
+def test_csr_graph_keeps_first_edges_in_order():
+    G = CSRMultiDiGraph()
+    G.add_nodes_from([(1, {"type": "module"}), (2, {"type": "dummy", "field_name": "START"}), "a"])
+    G.add_edges_from([(1, 2, "AST"), (2, "a", "CF"), (1, "b", "AST"), (1, 2, "AST"), (1, "a", "DF")])
+    
+    assert GraphVisitor.get_nodes_by_type(G, "dummy") == [2]
+    assert GraphVisitor.get_dummy_nodes(G, "START") == [2]
+    assert GraphVisitor.get_successors_by_edge_type(G, 1, "AST") == [2, "b"]
+    assert list(G.successors(1)) == [2, "b", "a"]
+    assert list(G.predecessors("a")) == [2, 1]
+    with pytest.raises(TypeError):
+        G.remove_node(2)
+    assert G.has_edge(1, "a", "DF") and not G.has_edge(1, "a", "CF")
+    assert G.number_of_edges() == 4
+    assert list(G.edges(keys=True)) == list(G.to_networkx().edges(keys=True))
+    
+def test_npz_export_loads_without_networkx(tmp_path):
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    cpg = Utils.generate_cpg(test_dir)
+    cpg.export(str(tmp_path / 'cpg.npz'))
+    
+    script = ("import sys, json; from adjacency_bundle import AdjacencyBundle; "
+              f"bundle = AdjacencyBundle.load({str(tmp_path / 'cpg.npz')!r}); "
+              "assert 'networkx' not in sys.modules; "
+              "print(json.dumps([[int(n), e, [int(bundle.node_ids[v]) for v in bundle.get_successors(i, e)]] "
+              "for i, n in enumerate(bundle.node_ids) for e in bundle.edges])); "
+              "print(json.dumps([bundle.get_feature('type', i) for i in range(len(bundle))]))")
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=os.path.join(os.path.dirname(__file__), '..', 'pyclue'))
+    successors, types = [json.loads(line) for line in result.stdout.splitlines()]
+    
+    assert successors == [[n, e, GraphVisitor.get_successors_by_edge_type(cpg.graph, n, e)] for n in cpg.graph for e in ['AST', 'CF', 'DF']]
+    assert types == [n_type for _, n_type in cpg.graph.nodes(data='type')]
+    
+def test_stage_stats_count_edges_by_type(tmp_path, monkeypatch):
+    test_dir = os.path.join(os.path.dirname(__file__), 'repos/toy_project_1')
+    cpg = Utils.generate_cpg(test_dir)
+    csr_cpg = CodePropertyGraph(dir=test_dir, backend="csr")
+    csr_cpg.generate_asts()
+    
+    with StageStats(trace_memory=True) as stats:
+        stats.record("cpg_generation", cpg.graph)
+        stats.record("csr_ast_generation", csr_cpg.graph)
+        stats.write_json(tmp_path / 'stats.json')
+    assert not tracemalloc.is_tracing()
+    stages = json.loads((tmp_path / 'stats.json').read_text())["stages"]
+    
+    expected = {}
+    for _, _, edge_type in cpg.graph.edges(keys=True):
+        expected[edge_type] = expected.get(edge_type, 0) + 1
+    assert stages[0]["edges"] == GraphSize.count_edges_by_type(nx.MultiDiGraph(cpg.graph)) == expected
+    assert stages[0]["nodes"] == stages[1]["nodes"] == cpg.graph.number_of_nodes()
+    assert stages[1]["edges"] == {"AST": expected["AST"]}
+    assert 0 < stages[1]["graph_bytes"] < stages[0]["graph_bytes"]
+    
+    # Without the resource module, as on Windows, peak RSS is unknown rather than an error
+    monkeypatch.setattr(sys.modules[StageStats.__module__], "resource", None)
+    stats = StageStats()
+    stats.record("no_resource")
+    assert stats.stages[0]["peak_rss_bytes"] is None and stats.stages[0]["workers_peak_rss_bytes"] is None
+    
+def test_reaching_definitions_follow_loop_back_edges(tmp_path):
+    (tmp_path / "loop.py").write_text("x = 0\nwhile x < 10:\n    x = x + 1\nprint(x)\n")
+    cpg = Utils.generate_cpg(str(tmp_path), workers=1, df_engine="reaching_definitions")
+    
+    def line(n):
+        return cpg.graph.nodes[n]["start_point"][0] + 1
+    df_lines = {(line(u), line(v)) for u, v, key in cpg.graph.edges(keys=True)
+                if key == "DF" and GraphVisitor.get_node_text(cpg.graph, v) == "x"}
+    # both definitions reach every use, the increment seeing its own definition only through the back edge
+    assert df_lines == {(1, 2), (3, 2), (1, 3), (3, 3), (1, 4), (3, 4)}
+    
+def test_walk_links_uses_to_the_definitions_before_them(tmp_path):
+    (tmp_path / "redefine.py").write_text("data = load()\nif check(data):\n    data = data.split()\ndata = []\nsize = len(data)\n")
+    (tmp_path / "branch.py").write_text("data = load()\nif check(data):\n    data = data.split()\nsize = len(data)\n")
+    cpg = Utils.generate_cpg(str(tmp_path), workers=1)
+
+    def df_lines(module):
+        def line(n):
+            return cpg.graph.nodes[n]["start_point"][0] + 1
+        return {(line(u), line(v)) for u, v, key in cpg.graph.edges(keys=True)
+                if key == "DF" and cpg.graph.nodes[v]["module"] == module and GraphVisitor.get_node_text(cpg.graph, v) == "data"}
+    # A statement's uses see the definitions before it (1 -> 3, not 3 -> 3), and uses are looked up under each
+    # statement only, so a redefinition ends the first definition (no 1 -> 4 or 1 -> 5)
+    assert df_lines("redefine.py") == {(1, 2), (1, 3), (4, 5)}
+    # Known gap: an if without else has no CF edge for its false branch, so only the branch's definition reaches 4
+    assert df_lines("branch.py") == {(1, 2), (1, 3), (3, 4)}
+
+def test_child_indexes_follow_ast_edges():
+    G = IndexedMultiDiGraph()
+    G.add_nodes_from([(1, {"type": "call", "field_name": None}),
+                      (2, {"type": "identifier", "field_name": "function"}),
+                      (3, {"type": "argument_list", "field_name": "arguments"}),
+                      (4, {"type": "identifier", "field_name": "function"})])
+    G.add_edges_from([(1, 2, "AST"), (1, 3, "AST"), (1, 4, "DF")])
+    
+    assert GraphVisitor.get_child_by_field_name(G, 1, "function") == 2
+    assert GraphVisitor.get_children_by_types(G, 1, ["argument_list", "identifier"]) == [2, 3]
+    
+    G.remove_node(2)
+    assert GraphVisitor.get_child_by_field_name(G, 1, "function") is None
+    assert GraphVisitor.get_child_by_type(G, 1, "argument_list") == 3
+    
+def test_type_index_follows_node_order():
+    G = IndexedMultiDiGraph()
+    G.add_nodes_from([(1, {"type": "module"}), (2, {"type": "dummy", "field_name": "START"}),
+                      (3, {"type": "dummy", "field_name": "EXIT"}), (4, {"type": "module"})])
+    G.remove_node(1)
+    G.add_node(1, type="module")
+    G.add_node(4, type="identifier")
+    # Attribute updates that leave type and field name alone keep the node's place
+    G.add_nodes_from([(2, {"inferred_type": "int"})])
+    G.add_node(2, start_point=(0, 0))
+    
+    assert GraphVisitor.get_nodes_by_type(G, "module") == [1]
+    assert GraphVisitor.get_nodes_by_type(G, "identifier") == [4]
+    assert GraphVisitor.get_dummy_nodes(G, "START") == [2]
+    assert GraphVisitor.get_nodes_by_type(G, "dummy") == [n for n, n_type in G.nodes(data="type") if n_type == "dummy"]
+    
+def test_descendants_cache_keeps_recently_used_lists():
+    G = IndexedMultiDiGraph()
+    G.descendants_cache_size = 2
+    G.add_nodes_from([(1, {"type": "call"}), (2, {"type": "identifier"}), (3, {"type": "identifier"})])
+    G.add_edges_from([(1, 2, "AST"), (2, 3, "AST")])
+
+    for n in [1, 2, 1, 3]:
+        assert G.get_ast_descendants_by_type(n, "identifier") == [m for m in [2, 3] if m >= n]
+    assert list(G._ast_descendants_by_type) == [(1, "identifier"), (3, "identifier")]
+
+def test_edge_type_layers_match_filtered_edges():
+    G = IndexedMultiDiGraph()
+    G.add_edges_from([(1, 2, "AST"), (1, 3, "AST"), (2, 3, "CF"), (1, 3, "DF"), (3, 2, "DF")])
+    G.remove_edge(1, 3, "AST")
+    G.remove_node(2)
+    G.add_edge(4, 3, "CF")
+    
+    plain_G = nx.MultiDiGraph(G)
+    for n in G.nodes:
+        for edge_type in ["AST", "CF", "DF"]:
+            assert GraphVisitor.get_outdegree_edges_by_type(G, n, edge_type) == GraphVisitor.get_outdegree_edges_by_type(plain_G, n, edge_type)
+            assert GraphVisitor.get_indegree_edges_by_type(G, n, edge_type) == GraphVisitor.get_indegree_edges_by_type(plain_G, n, edge_type)
+    assert GraphVisitor.get_parent(G, 3, "DF") == 1
+    
+def test_sorted_successors_use_presorted_ast_children():
+    G = IndexedMultiDiGraph()
+    G.add_nodes_from([(n, {"type": "identifier", "src_bytes_range": (start, start + 1)})
+                      for n, start in [(1, 0), (2, 4), (3, 2), (4, 3), (5, 1)]])
+    G.add_edges_from([(1, 2, "AST"), (1, 3, "AST"), (1, 4, "CF"), (1, 5, "AST")])
+    
+    expected = list(GraphVisitor.immediate_successors(nx.MultiDiGraph(G), 1, sort=True))
+    assert expected == [5, 3, 4, 2]
+    assert list(GraphVisitor.immediate_successors(G, 1, sort=True)) == expected
+    G.remove_edge(1, 4)
+    assert list(GraphVisitor.immediate_successors(G, 1, sort=True)) == [5, 3, 2]
+    
+def test_cf_walker_waits_for_predecessors_but_not_back_edges():
+    G = IndexedMultiDiGraph()
+    # 1 branches to 2 and 3 which join at 4, 4 heads a loop over 5 and exits to 6
+    G.add_edges_from([(1, 2, "CF"), (1, 3, "CF"), (2, 4, "CF"), (3, 4, "CF"), (4, 5, "CF"), (5, 4, "CF"), (4, 6, "CF")])
+    
+    walk = list(NXAlgorithms.dfs_successors_by_edge_property(G, 1, "CF"))
+    assert [n for n, _, _ in walk] == [1, 2, 3, 4, 5, 6]
+    assert walk[2] == (3, [4], [4])
+    assert walk[3] == (4, [5, 6], [])
+    
+def test_postorder_lists_children_before_parents():
+    G = IndexedMultiDiGraph()
+    G.add_edges_from([(1, 2, "AST"), (1, 3, "AST"), (2, 4, "AST"), (2, 5, "AST"), (3, 5, "DF")])
+    assert NXAlgorithms.postorder_by_edge_type(G, 1, "AST") == [4, 5, 2, 3, 1]
+    assert NXAlgorithms.postorder_by_edge_type(G, 4, "AST") == [4]
+    
+    depth = 10 * sys.getrecursionlimit()
+    G.add_edges_from((n, n + 1, "AST") for n in range(10, 10 + depth))
+    assert NXAlgorithms.postorder_by_edge_type(G, 10, "AST") == list(range(10 + depth, 9, -1))
+    
+def test_descendant_identifiers_stay_in_the_subtree():
+    G = IndexedMultiDiGraph()
+    G.add_nodes_from([(1, {"type": "call"}), (2, {"type": "identifier"}), (3, {"type": "argument_list"}),
+                      (4, {"type": "identifier"}), (5, {"type": "expression_statement"}), (6, {"type": "identifier"})])
+    G.add_edges_from([(1, 2, "AST"), (1, 3, "AST"), (3, 4, "AST"), (5, 6, "AST"), (3, 5, "CF"), (4, 6, "DF")])
+    
+    assert GraphVisitor.find_descendants_by_type(G, 1, "identifier") == [2, 4]
+    assert GraphVisitor.find_descendants_by_type(nx.MultiDiGraph(G), 1, "identifier") == [2, 4]
+    G.add_node(7, type="identifier")
+    G.add_edge(3, 7, "AST")
+    assert GraphVisitor.find_descendants_by_type(G, 1, "identifier") == [2, 4, 7]
+    
 def assert_nodes_equal(test_G: nx.MultiDiGraph, truth_G: nx.MultiDiGraph):
     for test_n, test_n_data in test_G.nodes(data=True):
         truth_n_data = truth_G.nodes.get(test_n, None)
@@ -34,6 +416,14 @@ def assert_edges_equal(test_G: nx.MultiDiGraph, truth_G: nx.MultiDiGraph, edge_t
     assert set(test_edges) == set(truth_edges), f"Edges of type {edge_type} do not match"
 
 class Utils:
+    @staticmethod
+    def generate_cpg(test_dir, **kwargs):
+        cpg = CodePropertyGraph(dir=test_dir, **kwargs)
+        cpg.generate_asts()
+        cpg.generate_cfgs()
+        cpg.generate_dfgs()
+        return cpg
+    
     @staticmethod
     def load_graph_from_json(json_file_path):
         data = json.load(open(json_file_path, 'r'))